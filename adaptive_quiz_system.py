@@ -453,7 +453,7 @@ class AdaptiveQuizSystem:
         if not next_review:
             return False
         
-        return datetime.fromisoformat(next_review) <= datetime.now()
+        return next_review <= datetime.now().timestamp()
     
     def get_recent_error_count(self, word_id: str) -> int:
         """Get recent error count for a word"""
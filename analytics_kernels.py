@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Numeric kernels for German Daily Word Bot learning analytics
+Loop-based aggregations that numba JIT-compiles when it is installed
+"""
+
+# numba is optional; without it the kernels run as plain Python
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True)
+def recent_mean(values, window):
+    """Mean of the last `window` values (0.0 when there are none)"""
+    n = len(values)
+    start = max(0, n - window)
+    if n == start:
+        return 0.0
+    total = 0.0
+    for i in range(start, n):
+        total += values[i]
+    return total / (n - start)
+
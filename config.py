@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Shared configuration for German Daily Word Bot scripts
+Loads the .env file once per process, caches the bot token and
+builds pooled Telegram API sessions
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# orjson is an optional fast path for (de)serializing JSON; modules that also
+# serialize with it import it from here
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+API_URL_TEMPLATE = "https://api.telegram.org/bot{}"
+
+# Telegram bot tokens look like "<bot id>:<35-character secret>"
+BOT_TOKEN_RE = re.compile(r'^\d+:[A-Za-z0-9_-]{35}$')
+
+# Append-only progress histories keep only their most recent entries so
+# that the cost of each save stays bounded over a user's lifetime
+HISTORY_LIMIT = 365
+
+_dotenv_loaded = False
+
+
+def _ensure_dotenv():
+    """Parse the .env file on first use only"""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        load_dotenv()
+        _dotenv_loaded = True
+
+
+@lru_cache(maxsize=1)
+def get_bot_token():
+    """Return BOT_TOKEN from the environment (None if it is not set)"""
+    _ensure_dotenv()
+    return os.environ.get('BOT_TOKEN')
+
+
+@lru_cache(maxsize=1)
+def get_webhook_secret():
+    """Return TELEGRAM_WEBHOOK_SECRET from the environment ('' if it is not set)"""
+    _ensure_dotenv()
+    return os.environ.get('TELEGRAM_WEBHOOK_SECRET', '')
+
+
+def webhook_params(webhook_url):
+    """setWebhook fields for webhook_url, with the secret token when one is configured
+
+    The webhook server rejects updates without the secret, so every caller
+    that registers the webhook must send it
+    """
+    params = {'url': webhook_url}
+    secret = get_webhook_secret()
+    if secret:
+        params['secret_token'] = secret
+    return params
+
+
+def create_session():
+    """Build a pooled, keep-alive session for Telegram API calls"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=10,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504])
+    ))
+    session.headers.update({'Connection': 'keep-alive', 'Accept-Encoding': 'gzip'})
+    return session
+
+
+def loads_json(raw: bytes):
+    """Parse a UTF-8 JSON document, preferring orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def response_json(response):
+    """Decode a JSON response body, preferring orjson when installed"""
+    return loads_json(response.content)
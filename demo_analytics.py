@@ -176,6 +176,7 @@ class AnalyticsDemo:
         for i, quiz in enumerate(quiz_sessions, 1):
             user_progress.track_quiz_performance(quiz)
             print(f"   Quiz {i}: {quiz['score']}/{quiz['total']} ({quiz['percentage']:.1f}%) - {quiz['type']}")
+        user_progress.flush()
         
         # Show quiz analytics
         quiz_scores = user_progress.data.get('quiz_scores', [])
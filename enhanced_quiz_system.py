@@ -363,6 +363,7 @@ class EnhancedQuizSystem:
                 ]
             }
             self.user_progress.track_quiz_performance(enhanced_results)
+            self.user_progress.flush()
         
         return results
     
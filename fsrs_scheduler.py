@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+FSRS Spaced Repetition Scheduler for German Daily Word Bot
+Adaptive review scheduling based on the Free Spaced Repetition Scheduler
+(FSRS-4.5) memory model: each card tracks stability and difficulty
+"""
+
+import math
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+# Review ratings
+AGAIN = 1
+HARD = 2
+GOOD = 3
+EASY = 4
+
+# Default FSRS-4.5 model weights
+DEFAULT_WEIGHTS = (
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755
+)
+
+# Forgetting curve R(t, S) = (1 + FACTOR * t / S) ** DECAY, so R(S, S) = 0.9
+DECAY = -0.5
+FACTOR = 0.9 ** (1 / DECAY) - 1
+
+SECONDS_PER_DAY = 86400
+
+
+class FSRSScheduler:
+    def __init__(self, weights: Sequence[float] = DEFAULT_WEIGHTS,
+                 desired_retention: float = 0.9, maximum_interval: int = 36500):
+        self.w = w = tuple(weights)
+        self.desired_retention = desired_retention
+        self.maximum_interval = maximum_interval
+
+        # Everything that depends only on the weights and the rating is
+        # evaluated once here; the tables are indexed by rating (1-4)
+        ratings = range(AGAIN, EASY + 1)
+        self._interval_factor = (desired_retention ** (1 / DECAY) - 1) / FACTOR
+        self._init_stability_by_rating = (None,) + tuple(max(w[r - 1], 0.1) for r in ratings)
+        self._init_difficulty_by_rating = (None,) + tuple(
+            self._clamp_difficulty(w[4] - (r - 3) * w[5]) for r in ratings
+        )
+        self._difficulty_step_by_rating = (None,) + tuple(w[6] * (r - 3) for r in ratings)
+        self._recall_scale_by_rating = (None,) + tuple(
+            math.exp(w[8]) * (w[15] if r == HARD else 1.0) * (w[16] if r == EASY else 1.0)
+            for r in ratings
+        )
+        # Mean reversion pulls difficulty towards the initial 'good' difficulty
+        self._reversion_target = w[7] * w[4]
+
+    def init_card(self, now: Optional[datetime] = None, rating: int = GOOD) -> Dict:
+        """Create the memory state for a newly learned word"""
+        now_ts = (now or datetime.now()).timestamp()
+        stability = self._init_stability(rating)
+        return {
+            'stability': stability,
+            'difficulty': self._init_difficulty(rating),
+            'last_reviewed': now_ts,
+            'next_review': now_ts + self.next_interval(stability) * SECONDS_PER_DAY
+        }
+
+    def review(self, card: Dict, rating: int, now: Optional[datetime] = None) -> Dict:
+        """Return the updated memory state of a card after a review"""
+        now_ts = (now or datetime.now()).timestamp()
+        stability = card['stability']
+        difficulty = card['difficulty']
+        elapsed_days = max(0.0, (now_ts - card['last_reviewed']) / SECONDS_PER_DAY)
+        retrievability = self.retrievability(elapsed_days, stability)
+
+        if rating == AGAIN:
+            new_stability = self._forget_stability(difficulty, stability, retrievability)
+        else:
+            new_stability = self._recall_stability(difficulty, stability, retrievability, rating)
+
+        return {
+            'stability': new_stability,
+            'difficulty': self._next_difficulty(difficulty, rating),
+            'last_reviewed': now_ts,
+            'next_review': now_ts + self.next_interval(new_stability) * SECONDS_PER_DAY
+        }
+
+    def card_from_interval(self, interval_days: float) -> Dict:
+        """Approximate FSRS state for a word scheduled by the old fixed intervals"""
+        # The old interval is the best available estimate of the time at
+        # which recall drops to the desired retention
+        return {
+            'stability': max(interval_days, self.w[0]),
+            'difficulty': self._init_difficulty(GOOD)
+        }
+
+    @staticmethod
+    def retrievability(elapsed_days: float, stability: float) -> float:
+        """Probability of recalling a card after elapsed_days"""
+        return (1 + FACTOR * elapsed_days / stability) ** DECAY
+
+    def next_interval(self, stability: float) -> int:
+        """Days until recall probability falls to the desired retention"""
+        interval = stability * self._interval_factor
+        return min(max(1, round(interval)), self.maximum_interval)
+
+    def _init_stability(self, rating: int) -> float:
+        return self._init_stability_by_rating[rating]
+
+    def _init_difficulty(self, rating: int) -> float:
+        return self._init_difficulty_by_rating[rating]
+
+    def _next_difficulty(self, difficulty: float, rating: int) -> float:
+        next_d = difficulty - self._difficulty_step_by_rating[rating]
+        return self._clamp_difficulty(self._reversion_target + (1 - self.w[7]) * next_d)
+
+    def _recall_stability(self, difficulty: float, stability: float,
+                          retrievability: float, rating: int) -> float:
+        return stability * (
+            1 + self._recall_scale_by_rating[rating] * (11 - difficulty)
+            * stability ** -self.w[9]
+            * (math.exp((1 - retrievability) * self.w[10]) - 1)
+        )
+
+    def _forget_stability(self, difficulty: float, stability: float,
+                          retrievability: float) -> float:
+        new_stability = (
+            self.w[11] * difficulty ** -self.w[12]
+            * ((stability + 1) ** self.w[13] - 1)
+            * math.exp((1 - retrievability) * self.w[14])
+        )
+        # A lapse never makes a card more stable than before
+        return min(new_stability, stability)
+
+    @staticmethod
+    def _clamp_difficulty(difficulty: float) -> float:
+        return min(max(difficulty, 1.0), 10.0)
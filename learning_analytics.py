@@ -7,10 +7,14 @@ Provides detailed insights, performance tracking, and predictive analytics
 import json
 import os
 import statistics
-from datetime import datetime, timedelta
+from array import array
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from analytics_kernels import recent_mean
+from config import HISTORY_LIMIT
+
 logger = logging.getLogger(__name__)
 
 class LearningAnalytics:
@@ -35,6 +39,8 @@ class LearningAnalytics:
             self.analytics_data['session_times'] = []
         
         self.analytics_data['session_times'].append(session_data)
+        if len(self.analytics_data['session_times']) > HISTORY_LIMIT:
+            del self.analytics_data['session_times'][:-HISTORY_LIMIT]
         
         # Update daily word counts
         today = datetime.now().strftime('%Y-%m-%d')
@@ -53,6 +59,7 @@ class LearningAnalytics:
         
         # Update engagement score
         self._update_engagement_score()
+        self.user_progress.mark_dirty()
         
         logger.info(f"Learning session tracked for user {self.user_progress.chat_id}: "
                    f"{len(words_learned)} words, {session_duration} minutes")
@@ -73,9 +80,12 @@ class LearningAnalytics:
             self.analytics_data['quiz_performance'] = []
         
         self.analytics_data['quiz_performance'].append(quiz_data)
+        if len(self.analytics_data['quiz_performance']) > HISTORY_LIMIT:
+            del self.analytics_data['quiz_performance'][:-HISTORY_LIMIT]
         
         # Update retention rates
         self._update_retention_rates(quiz_results)
+        self.user_progress.mark_dirty()
         
         logger.info(f"Quiz performance tracked: {quiz_results.get('percentage', 0):.1f}%")
     
@@ -99,22 +109,18 @@ class LearningAnalytics:
     
     def _calculate_learning_velocity(self):
         """Calculate learning velocity (words per day over time)"""
-        if not self.analytics_data.get('daily_word_counts'):
+        daily_word_counts = self.analytics_data.get('daily_word_counts')
+        if not daily_word_counts:
             self.analytics_data['learning_velocity'] = 0.0
             return
         
-        # Get last 30 days of data
-        recent_counts = []
-        for i in range(30):
-            date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-            count = self.analytics_data['daily_word_counts'].get(date, 0)
-            recent_counts.append(count)
-        
-        # Calculate average
-        if recent_counts:
-            self.analytics_data['learning_velocity'] = statistics.mean(recent_counts)
-        else:
-            self.analytics_data['learning_velocity'] = 0.0
+        # Average over the last 30 days, counting days without words as 0.
+        # Only the days in the window are looked up, so the cost doesn't grow
+        # with the length of the history
+        today = date.today()
+        counts = array('q', (daily_word_counts.get((today - timedelta(days=i)).isoformat(), 0)
+                             for i in range(30)))
+        self.analytics_data['learning_velocity'] = recent_mean(counts, 30)
     
     def _update_engagement_score(self):
         """Calculate user engagement score based on multiple factors"""
@@ -147,8 +153,8 @@ class LearningAnalytics:
             return 0.0
         
         recent_quizzes = quiz_data[-10:]  # Last 10 quizzes
-        percentages = [q['percentage'] for q in recent_quizzes]
-        return statistics.mean(percentages) if percentages else 0.0
+        percentages = array('d', (q['percentage'] for q in recent_quizzes))
+        return recent_mean(percentages, 10)
     
     def _calculate_consistency_score(self) -> float:
         """Calculate learning consistency score"""
@@ -401,9 +407,9 @@ class LearningAnalytics:
         return {'message': 'No retention data available'}
     
     def save_analytics(self):
-        """Save analytics data back to user progress"""
+        """Store analytics data back in user progress (written on its next flush)"""
         self.user_progress.data['learning_analytics'] = self.analytics_data
-        self.user_progress.save_progress()
+        self.user_progress.mark_dirty()
     
     def get_predictive_insights(self) -> Dict:
         """Generate predictive insights for user engagement"""
@@ -116,11 +116,12 @@ class MultiUserGermanBot:
 
             if success:
                 # Update progress with enhanced tracking
-                streak_info = user_progress.update_daily_streak(daily_words)
+                now = datetime.now()
+                streak_info = user_progress.update_daily_streak(daily_words, now)
                 for word in daily_words:
                     if 'level' not in word:
                         word['level'] = 'A1'
-                    user_progress.add_learned_word(word)
+                    user_progress.add_learned_word(word, now)
 
                 # Add streak message if milestone reached
                 if streak_info and (streak_info.get('milestone_reached') or
@@ -129,7 +130,7 @@ class MultiUserGermanBot:
                     streak_message = user_progress.get_streak_message(streak_info)
                     self.send_message(chat_id, f"\n\n{streak_message}")
 
-                user_progress.save_progress()
+                user_progress.flush()
             
             return success
             
@@ -10,6 +10,7 @@ import logging
 import requests
 from datetime import datetime
 from dotenv import load_dotenv
+from config import webhook_params
 
 load_dotenv()
 
@@ -20,6 +21,9 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# (connect, read) timeout for webhook management and bot info calls
+API_TIMEOUT = (3.05, 10)
+
 class MultiUserManager:
     def __init__(self):
         self.bot_token = os.getenv('BOT_TOKEN')
@@ -30,6 +34,10 @@ class MultiUserManager:
         self.active_users_file = "active_users.json"
         self.webhook_url = None  # Set this for webhook deployment
         
+        # Keep-alive session for Telegram API calls; the webhook server swaps
+        # in its shared pooled session
+        self.session = requests.Session()
+        
         # Load or create active users database
         self.active_users = self.load_active_users()
         
@@ -158,7 +166,7 @@ Type /help for commands or just wait for your first lesson!
                 'parse_mode': 'Markdown'
             }
             
-            response = requests.post(url, data=data, timeout=30)
+            response = self.session.post(url, data=data, timeout=30)
             
             if response.status_code == 200:
                 return True
@@ -174,9 +182,9 @@ Type /help for commands or just wait for your first lesson!
         """Setup webhook for real-time bot responses"""
         try:
             url = f"{self.api_url}/setWebhook"
-            data = {'url': webhook_url}
+            data = webhook_params(webhook_url)
             
-            response = requests.post(url, data=data)
+            response = self.session.post(url, data=data, timeout=API_TIMEOUT)
             
             if response.status_code == 200:
                 logger.info(f"Webhook set successfully: {webhook_url}")
@@ -193,7 +201,7 @@ Type /help for commands or just wait for your first lesson!
         """Remove webhook (for polling mode)"""
         try:
             url = f"{self.api_url}/deleteWebhook"
-            response = requests.post(url)
+            response = self.session.post(url, timeout=API_TIMEOUT)
             
             if response.status_code == 200:
                 logger.info("Webhook removed successfully")
@@ -210,7 +218,7 @@ Type /help for commands or just wait for your first lesson!
         """Get bot information"""
         try:
             url = f"{self.api_url}/getMe"
-            response = requests.get(url)
+            response = self.session.get(url, timeout=API_TIMEOUT)
             
             if response.status_code == 200:
                 data = response.json()
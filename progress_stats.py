@@ -131,7 +131,7 @@ class ProgressAnalytics:
         success_rates = []
         
         for word_id, review_data in self.user_progress.data.get('spaced_repetition', {}).items():
-            next_review = datetime.fromisoformat(review_data['next_review'])
+            next_review = datetime.fromtimestamp(review_data['next_review'])
             
             if next_review.date() == now.date():
                 due_today += 1
@@ -286,6 +286,7 @@ class QuizSystem:
         
         correct_count = 0
         total_questions = len(quiz_data['questions'])
+        now = datetime.now()
         
         for i, question in enumerate(quiz_data['questions']):
             if i < len(user_answers):
@@ -295,10 +296,10 @@ class QuizSystem:
                 
                 # Update spaced repetition for this word
                 word_id = question['word_id']
-                self.user_progress.update_review_result(word_id, is_correct)
+                self.user_progress.update_review_result(word_id, is_correct, now)
         
         # Save updated progress
-        self.user_progress.save_progress()
+        self.user_progress.flush()
         
         score_percentage = (correct_count / total_questions) * 100
         
@@ -310,14 +310,15 @@ class GermanWordBot:
 
                 if success:
                     # Mark words as learned and update progress
+                    now = datetime.now()
                     for word in daily_words:
                         # Ensure word has required fields for progress tracking
                         if 'level' not in word:
                             word['level'] = 'A1'  # Default level
-                        self.user_progress.add_learned_word(word)
+                        self.user_progress.add_learned_word(word, now)
 
                     # Save progress
-                    self.user_progress.save_progress()
+                    self.user_progress.flush()
 
                     logger.info("Enhanced German lesson sent successfully!")
                     word_list = [f"{word['german']} ({word.get('level', 'A1')})" for word in daily_words]
@@ -102,6 +102,7 @@ class StreakManager:
         if current_streak > self.user_progress.data.get('longest_streak', 0):
             self.user_progress.data['longest_streak'] = current_streak
         
+        self.user_progress.mark_dirty()
         return streak_info
     
     def _can_use_grace_period(self) -> bool:
@@ -169,6 +170,7 @@ class StreakManager:
             current_freezes = self.user_progress.data.get('streak_freeze_available', 0)
             self.user_progress.data['streak_freeze_available'] = current_freezes + freeze_bonus
         
+        self.user_progress.mark_dirty()
         logger.info(f"Milestone {milestone} awarded to user {self.user_progress.chat_id}")
     
     def get_streak_stats(self) -> Dict:
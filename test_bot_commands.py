@@ -4,11 +4,16 @@ Bot Commands Testing Script
 Test all bot commands to ensure they work correctly
 """
 
+import asyncio
+import io
 import os
 import json
+import logging
 import requests
+import threading
 import time
 from datetime import datetime
+from unittest import mock
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -160,6 +165,7 @@ class BotCommandTester:
         print("\n🌐 TESTING WEBHOOK INTEGRATION...")
         
         try:
+            import webhook_server
             from webhook_server import app
             print("✅ Webhook server module loaded")
             
@@ -169,15 +175,222 @@ class BotCommandTester:
                 response = client.get('/')
                 if response.status_code == 200:
                     print("✅ Health endpoint working")
-                    return True
                 else:
                     print(f"❌ Health endpoint failed: {response.status_code}")
                     return False
+                
+                if not webhook_server.bot_handler:
+                    print("⚠️  Bot handler not available - skipping webhook endpoint tests")
+                    return True
+                
+                results = [
+                    self._test_webhook_requests(webhook_server, client),
+                    self._test_webhook_chat_order(webhook_server, client),
+                    self._test_webhook_queue_full(webhook_server, client),
+                    self._test_asgi_guard(webhook_server)
+                ]
+            
+            results.append(self._test_message_batcher(webhook_server))
+            results.append(self._test_log_dedupe(webhook_server))
+            return all(results)
                     
         except Exception as e:
             print(f"❌ Webhook integration error: {e}")
             return False
     
+    def _post_update(self, client, update_id, chat_id=1, headers=None):
+        """POST a minimal Telegram update to the webhook endpoint"""
+        body = json.dumps({
+            'update_id': update_id,
+            'message': {'chat': {'id': chat_id}, 'text': str(update_id)}
+        })
+        return client.post('/webhook', data=body, content_type='application/json', headers=headers)
+    
+    def _check(self, name, passed):
+        """Print and return the outcome of a single check"""
+        print(f"{'✅' if passed else '❌'} {name}")
+        return passed
+    
+    def _test_webhook_requests(self, webhook_server, client):
+        """Status codes for authentication, malformed and oversized requests"""
+        handler = webhook_server.bot_handler
+        original_process, original_secret = handler.process_update, webhook_server._SECRET
+        processed = threading.Event()
+        handler.process_update = lambda update: processed.set()
+        webhook_server._SECRET = b'test-secret'
+        secret = {webhook_server.SECRET_HEADER: 'test-secret'}
+        try:
+            results = [
+                self._check("Webhook rejects requests without the secret (401)",
+                            self._post_update(client, 1).status_code == 401),
+                self._check("Webhook rejects a wrong secret (401)",
+                            self._post_update(client, 2, headers={webhook_server.SECRET_HEADER: 'nope'}).status_code == 401),
+                self._check("Webhook rejects invalid JSON (400)",
+                            client.post('/webhook', data='{not json', headers=secret).status_code == 400),
+                self._check("Webhook rejects payloads without update_id (400)",
+                            client.post('/webhook', data='{"message": {}}', headers=secret).status_code == 400),
+                self._check("Webhook rejects malformed messages and chats (400)",
+                            all(client.post('/webhook', data=body, headers=secret).status_code == 400
+                                for body in ('{"update_id": 1, "message": "x"}',
+                                             '{"update_id": 1, "message": {"chat": "x"}}',
+                                             '{"update_id": 1, "message": {"chat": {"id": [1]}}}'))),
+                self._check("Webhook rejects oversized bodies (413)",
+                            client.post('/webhook', data=b'x' * (webhook_server.MAX_BODY + 1),
+                                        headers=secret).status_code == 413),
+                self._check("Webhook rejects oversized chunked bodies (413)",
+                            client.post('/webhook', input_stream=io.BytesIO(b'x' * (webhook_server.MAX_BODY + 1)),
+                                        headers=dict(secret, **{'Transfer-Encoding': 'chunked'}),
+                                        environ_overrides={'wsgi.input_terminated': True}).status_code == 413)
+            ]
+            
+            response = self._post_update(client, 3, headers=secret)
+            results.append(self._check("Webhook acknowledges updates with an empty 200",
+                                       response.status_code == 200 and response.data == b''))
+            results.append(self._check("Acknowledged update reaches the bot handler",
+                                       processed.wait(5)))
+            return all(results)
+        finally:
+            handler.process_update, webhook_server._SECRET = original_process, original_secret
+    
+    def _test_webhook_chat_order(self, webhook_server, client):
+        """Updates for one chat are processed in arrival order"""
+        handler = webhook_server.bot_handler
+        original_process = handler.process_update
+        seen = []
+        done = threading.Event()
+        
+        def record(update):
+            time.sleep(0.01)  # Give later updates a chance to overtake
+            seen.append(update['update_id'])
+            if len(seen) == 20:
+                done.set()
+        
+        handler.process_update = record
+        try:
+            statuses = [self._post_update(client, update_id, chat_id=42).status_code
+                        for update_id in range(20)]
+            return self._check("Updates for one chat are processed in order",
+                               statuses == [200] * 20 and done.wait(5) and seen == list(range(20)))
+        finally:
+            handler.process_update = original_process
+    
+    def _test_webhook_queue_full(self, webhook_server, client):
+        """A full update queue answers 503 so Telegram retries later"""
+        handler = webhook_server.bot_handler
+        original_process, original_pending = handler.process_update, webhook_server._pending_updates
+        release = threading.Event()
+        handler.process_update = lambda update: release.wait(5)
+        webhook_server._pending_updates = threading.BoundedSemaphore(1)
+        try:
+            first = self._post_update(client, 1, chat_id=101).status_code
+            second = self._post_update(client, 2, chat_id=102).status_code
+            passed = self._check("Webhook answers 503 when the update queue is full",
+                                 first == 200 and second == 503)
+        finally:
+            release.set()
+            # The blocked update still has to give its permit back to the
+            # test semaphore and unregister its chat before anything is restored
+            deadline = time.time() + 5
+            while 101 in webhook_server._chat_queues and time.time() < deadline:
+                time.sleep(0.01)
+            handler.process_update = original_process
+            webhook_server._pending_updates = original_pending
+        
+        processed = threading.Event()
+        handler.process_update = lambda update: processed.set()
+        try:
+            self._post_update(client, 3, chat_id=101)
+            return passed and self._check("Chat keeps processing after the queue drains",
+                                          processed.wait(5))
+        finally:
+            handler.process_update = original_process
+    
+    def _asgi_post(self, asgi_app, chunks, headers=()):
+        """Drive one POST /webhook through an ASGI app; returns (status, body reads)"""
+        messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                    for i, chunk in enumerate(chunks)]
+        reads = []
+        sent = []
+        
+        async def receive():
+            reads.append(True)
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+        
+        async def send(message):
+            sent.append(message)
+        
+        scope = {
+            'type': 'http', 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+            'path': '/webhook', 'root_path': '', 'query_string': b'',
+            'headers': list(headers), 'server': ('testserver', 80), 'client': ('127.0.0.1', 1)
+        }
+        asyncio.run(asgi_app(scope, receive, send))
+        return sent[0]['status'], len(reads)
+    
+    def _test_asgi_guard(self, webhook_server):
+        """Under uvicorn, bad requests are rejected before the body is buffered"""
+        if webhook_server.asgi_app is None:
+            print("⚠️  uvicorn/asgiref not installed - skipping ASGI guard tests")
+            return True
+        
+        handler = webhook_server.bot_handler
+        original_process, original_secret = handler.process_update, webhook_server._SECRET
+        processed = threading.Event()
+        handler.process_update = lambda update: processed.set()
+        webhook_server._SECRET = b'test-secret'
+        secret = (webhook_server.SECRET_HEADER.lower().encode(), b'test-secret')
+        update = json.dumps({'update_id': 1, 'message': {'chat': {'id': 201}}}).encode()
+        too_big = str(webhook_server.MAX_BODY + 1).encode()
+        try:
+            return all([
+                self._check("ASGI guard rejects a missing secret without reading the body (401)",
+                            self._asgi_post(webhook_server.asgi_app, [update]) == (401, 0)),
+                self._check("ASGI guard rejects a declared oversized body without reading it (413)",
+                            self._asgi_post(webhook_server.asgi_app, [b'x'],
+                                            [secret, (b'content-length', too_big)]) == (413, 0)),
+                self._check("ASGI guard stops reading a streamed body at the limit (413)",
+                            self._asgi_post(webhook_server.asgi_app, [b'x' * 65536] * 32,
+                                            [secret])[0] == 413),
+                self._check("ASGI guard passes chunked updates through to the handler",
+                            self._asgi_post(webhook_server.asgi_app, [update[:10], update[10:]],
+                                            [secret, (b'transfer-encoding', b'chunked')])[0] == 200
+                            and processed.wait(5))
+            ])
+        finally:
+            handler.process_update, webhook_server._SECRET = original_process, original_secret
+    
+    def _test_message_batcher(self, webhook_server):
+        """MessageBatcher joins messages per chat and splits at max_chars"""
+        sent = []
+        batcher = webhook_server.MessageBatcher(lambda chat_id, text: sent.append((chat_id, text)),
+                                                flush_interval=3600, max_chars=12)
+        for text in ('one', 'two', 'three'):
+            batcher.send_message(1, text)
+        batcher.send_message(2, 'other')
+        batcher.flush()
+        return self._check("Message batcher joins and splits per-chat messages",
+                           sent == [(1, 'one\ntwo'), (1, 'three'), (2, 'other')])
+    
+    def _test_log_dedupe(self, webhook_server):
+        """Repeated log lines within the dedupe window are dropped and counted"""
+        original_window = webhook_server.LOG_DEDUPE_WINDOW
+        with mock.patch.object(webhook_server.logger, 'log') as log:
+            try:
+                webhook_server.LOG_DEDUPE_WINDOW = 60
+                for _ in range(3):
+                    webhook_server._log_deduped(logging.ERROR, "dedupe test: %s", 'boom')
+                first_calls = log.call_count
+                
+                webhook_server.LOG_DEDUPE_WINDOW = 0
+                webhook_server._log_deduped(logging.ERROR, "dedupe test: %s", 'boom')
+            finally:
+                webhook_server.LOG_DEDUPE_WINDOW = original_window
+        
+        return self._check("Repeated webhook errors are logged once",
+                           first_calls == 1 and log.call_count == 2
+                           and log.call_args[0][1].endswith("(%d similar messages suppressed)")
+                           and log.call_args[0][-1] == 2)
+    
     def generate_test_report(self, functionality_tests, webhook_test):
         """Generate comprehensive test report"""
         print("\n" + "=" * 50)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Per-thread stdout capture for the deployment verification scripts
+Lets checks run concurrently while their printed reports stay grouped
+"""
+
+import io
+import threading
+
+
+class ThreadOutput(io.TextIOBase):
+    """Stdout proxy that routes each worker thread's prints to its own buffer"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def capture(self, check, *args):
+        """Run a check in the current thread, returning (result, printed output)"""
+        self._local.buffer = io.StringIO()
+        try:
+            return check(*args), self._local.buffer.getvalue()
+        finally:
+            self._local.buffer = None
@@ -4,14 +4,26 @@ User Progress Tracking System for German Daily Word Bot
 Manages CEFR level progression, learned words, and spaced repetition
 """
 
+import copy
+import heapq
 import json
 import os
-from datetime import datetime, timedelta
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Dict, List, Optional
 import logging
 
+from config import HISTORY_LIMIT, ORJSON_AVAILABLE, loads_json, orjson
+from fsrs_scheduler import AGAIN, GOOD, SECONDS_PER_DAY, FSRSScheduler
+
 logger = logging.getLogger(__name__)
 
+_SCHEDULER = FSRSScheduler()
+
+# FSRS rating for a failed / successful review, indexed by int(success)
+_REVIEW_RATINGS = (AGAIN, GOOD)
+
 # Import new analytics modules
 try:
     from streak_manager import StreakManager
@@ -21,10 +33,94 @@ except ImportError:
     ANALYTICS_AVAILABLE = False
     logger.warning("Advanced analytics modules not available")
 
+def _dumps(data: Dict) -> bytes:
+    """Serialize progress JSON to UTF-8 bytes, preferring orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+@lru_cache(maxsize=1024)
+def _parse_iso_date(value: str) -> date:
+    """Parse an ISO-8601 date/datetime string to a date, memoized per string"""
+    return datetime.fromisoformat(value).date()
+
+
+def _next_midnight_ts(now_ts: float) -> float:
+    """Epoch time of the local midnight following now_ts"""
+    tomorrow = datetime.fromtimestamp(now_ts).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+# Streak lengths (days) that earn an achievement in basic streak tracking
+_STREAK_MILESTONES = frozenset({7, 30, 100, 365})
+
+# Level progression criteria
+_LEVEL_REQS = {
+    'A1': 50,   # 50 words to move to A2
+    'A2': 100,  # 100 additional words to move to B1
+    'B1': 150,  # 150 additional words to move to B2
+    'B2': 200   # B2 is the target level
+}
+_LEVEL_NEXT = {'A1': 'A2', 'A2': 'B1', 'B1': 'B2'}
+
+# Skeleton of a new user profile; timestamps and chat_id are filled per user
+_DEFAULT_PROGRESS_TEMPLATE = {
+    "chat_id": None,
+    "current_level": "A1",
+    "start_date": None,
+    "total_words_learned": 0,
+    "words_by_level": {
+        "A1": {"learned": [], "review_due": []},
+        "A2": {"learned": [], "review_due": []},
+        "B1": {"learned": [], "review_due": []},
+        "B2": {"learned": [], "review_due": []}
+    },
+    "daily_streak": 0,
+    "longest_streak": 0,
+    "total_study_days": 0,
+    "streak_milestones": [],
+    "last_lesson_date": None,
+    "streak_freeze_used": 0,
+    "streak_freeze_available": 1,
+    "grace_period_active": False,
+    "grace_period_expires": None,
+    "quiz_scores": [],
+    "weekly_goals": {
+        "words_per_week": 21,  # 3 words × 7 days
+        "current_week_count": 0,
+        "week_start": None
+    },
+    "learning_analytics": {
+        "session_times": [],
+        "daily_word_counts": {},
+        "category_performance": {},
+        "difficulty_progression": [],
+        "retention_rates": {},
+        "learning_velocity": 0.0,
+        "engagement_score": 0.0
+    },
+    "preferences": {
+        "words_per_day": 3,
+        "include_grammar": True,
+        "include_cultural_notes": True,
+        "difficulty_progression": "automatic"
+    },
+    "achievements": [],
+    "spaced_repetition": {}
+}
+
+
 class UserProgress:
+    __slots__ = ('chat_id', 'progress_file', 'data', 'streak_manager',
+                 'learning_analytics', 'vocabulary_manager', '_dirty',
+                 '_stats_cache', '_advanced_stats_cache', '_stats_expires_at',
+                 '_due_heap', '_learned_sets')
+
     def __init__(self, chat_id: str, vocabulary_manager=None):
         self.chat_id = chat_id
         self.progress_file = f"progress_{chat_id}.json"
+        self.vocabulary_manager = vocabulary_manager
         self.data = self.load_progress()
 
         # Initialize advanced analytics if available
@@ -37,197 +133,278 @@ class UserProgress:
         else:
             self.streak_manager = None
             self.learning_analytics = None
+
+        # Mutations only mark the profile dirty; flush() writes it once
+        self._dirty = False
+        self._stats_cache = None
+        self._advanced_stats_cache = None
+        # Cached stats include the due-review count and date-dependent
+        # analytics, which change with the clock: they also expire when the
+        # next scheduled word comes due, and at the next local midnight
+        self._stats_expires_at = 0.0
+
+        # Min-heap of (next_review_epoch, word_id), built on first review lookup
+        self._due_heap = None
+
+        # Set index over each level's ordered 'learned' list for O(1) membership
+        self._learned_sets = {
+            level: set(level_data['learned'])
+            for level, level_data in self.data['words_by_level'].items()
+        }
     
     def load_progress(self) -> Dict:
         """Load user progress from file or create new profile"""
-        default_progress = {
-            "chat_id": self.chat_id,
-            "current_level": "A1",
-            "start_date": datetime.now().isoformat(),
-            "total_words_learned": 0,
-            "words_by_level": {
-                "A1": {"learned": [], "review_due": []},
-                "A2": {"learned": [], "review_due": []},
-                "B1": {"learned": [], "review_due": []},
-                "B2": {"learned": [], "review_due": []}
-            },
-            "daily_streak": 0,
-            "longest_streak": 0,
-            "total_study_days": 0,
-            "streak_milestones": [],
-            "last_lesson_date": None,
-            "streak_freeze_used": 0,
-            "streak_freeze_available": 1,
-            "grace_period_active": False,
-            "grace_period_expires": None,
-            "quiz_scores": [],
-            "weekly_goals": {
-                "words_per_week": 21,  # 3 words × 7 days
-                "current_week_count": 0,
-                "week_start": datetime.now().isoformat()
-            },
-            "learning_analytics": {
-                "session_times": [],
-                "daily_word_counts": {},
-                "category_performance": {},
-                "difficulty_progression": [],
-                "retention_rates": {},
-                "learning_velocity": 0.0,
-                "engagement_score": 0.0
-            },
-            "preferences": {
-                "words_per_day": 3,
-                "include_grammar": True,
-                "include_cultural_notes": True,
-                "difficulty_progression": "automatic"
-            },
-            "achievements": [],
-            "spaced_repetition": {}
-        }
+        try:
+            with open(self.progress_file, 'rb') as f:
+                data = loads_json(f.read())
+        except FileNotFoundError:
+            return self._new_progress()
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading progress for {self.chat_id}: {e}")
+            return self._new_progress()
         
         try:
-            if os.path.exists(self.progress_file):
-                with open(self.progress_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                # Merge with default to ensure all fields exist
-                for key, value in default_progress.items():
-                    if key not in data:
-                        data[key] = value
-                return data
-            else:
-                return default_progress
+            # Merge with default to ensure all fields exist
+            missing = False
+            for key, value in _DEFAULT_PROGRESS_TEMPLATE.items():
+                if key not in data:
+                    data[key] = copy.deepcopy(value)
+                    missing = True
+            if missing:
+                self._fill_profile_defaults(data)
+            self._migrate_review_timestamps(data['spaced_repetition'])
+            self._trim_histories(data)
+            return data
         except Exception as e:
             logger.error(f"Error loading progress for {self.chat_id}: {e}")
-            return default_progress
+            return self._new_progress()
+    
+    def _new_progress(self) -> Dict:
+        """Create a fresh profile from the default template"""
+        data = copy.deepcopy(_DEFAULT_PROGRESS_TEMPLATE)
+        self._fill_profile_defaults(data)
+        return data
+    
+    def _fill_profile_defaults(self, data: Dict):
+        """Fill the per-user template fields left unset"""
+        if data['chat_id'] is None:
+            data['chat_id'] = self.chat_id
+        if data['start_date'] is None or data['weekly_goals'].get('week_start') is None:
+            now = datetime.now().isoformat()
+            if data['start_date'] is None:
+                data['start_date'] = now
+            if data['weekly_goals'].get('week_start') is None:
+                data['weekly_goals']['week_start'] = now
+    
+    @staticmethod
+    def _trim_histories(data: Dict):
+        """Drop history entries beyond HISTORY_LIMIT, keeping the newest"""
+        analytics = data['learning_analytics']
+        for history in (data['quiz_scores'], analytics.get('session_times'),
+                        analytics.get('quiz_performance'),
+                        analytics.get('difficulty_progression')):
+            if history and len(history) > HISTORY_LIMIT:
+                del history[:-HISTORY_LIMIT]
+    
+    @staticmethod
+    def _migrate_review_timestamps(spaced_repetition: Dict):
+        """Convert review times saved as ISO-8601 strings to epoch seconds"""
+        for review_data in spaced_repetition.values():
+            for field in ('next_review', 'last_reviewed'):
+                if isinstance(review_data.get(field), str):
+                    review_data[field] = datetime.fromisoformat(review_data[field]).timestamp()
     
     def save_progress(self):
         """Save user progress to file"""
         try:
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            # Build the whole payload first, then write it in one go to a temp
+            # file and rename it over the original so a crash never leaves a
+            # half-written profile behind
+            payload = memoryview(_dumps(self.data))
+            tmp_file = self.progress_file + '.tmp'
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                while payload:
+                    written = os.write(fd, payload)
+                    payload = payload[written:]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_file, self.progress_file)
+            self._dirty = False
             logger.info(f"Progress saved for user {self.chat_id}")
         except Exception as e:
             logger.error(f"Error saving progress for {self.chat_id}: {e}")
+
+    def mark_dirty(self):
+        """Flag in-memory progress as changed and drop cached statistics"""
+        self._dirty = True
+        self._stats_cache = None
+        self._advanced_stats_cache = None
+
+    def flush(self):
+        """Save progress once if anything changed since the last save"""
+        if self._dirty:
+            self.save_progress()
     
-    def add_learned_word(self, word_data: Dict):
+    def add_learned_word(self, word_data: Dict, now: Optional[datetime] = None):
         """Add a word to learned vocabulary with spaced repetition schedule"""
         word_id = word_data['german']
         level = word_data['level']
         
         # Add to learned words if not already there
-        if word_id not in self.data['words_by_level'][level]['learned']:
-            self.data['words_by_level'][level]['learned'].append(word_id)
-            self.data['total_words_learned'] += 1
-            
-            # Schedule for spaced repetition
-            self.schedule_spaced_repetition(word_id, word_data)
-            
-            logger.info(f"Added word '{word_id}' to learned vocabulary for user {self.chat_id}")
+        learned_set = self._learned_sets[level]
+        if word_id in learned_set:
+            return
+        
+        # Schedule for spaced repetition with the FSRS memory model; the full
+        # word entry is looked up in the vocabulary when it comes up for review
+        card = _SCHEDULER.init_card(now)
+        card['level'] = level
+        card['category'] = word_data.get('category', 'general')
+        card['review_count'] = 0
+        card['success_rate'] = 0.0
+        
+        learned_set.add(word_id)
+        self.data['words_by_level'][level]['learned'].append(word_id)
+        self.data['total_words_learned'] += 1
+        self.data['spaced_repetition'][word_id] = card
+        self._push_due(card['next_review'], word_id)
+        self.mark_dirty()
+        
+        logger.info(f"Added word '{word_id}' to learned vocabulary for user {self.chat_id}")
     
-    def schedule_spaced_repetition(self, word_id: str, word_data: Dict):
-        """Schedule word for spaced repetition using increasing intervals"""
-        now = datetime.now()
+    def _review_word_data(self, word_id: str, review_data: Dict) -> Optional[Dict]:
+        """Full vocabulary entry for a scheduled word"""
+        # Older profiles stored a copy of the word with its schedule
+        if 'word_data' in review_data:
+            return review_data['word_data']
         
-        # Spaced repetition intervals: 1 day, 3 days, 1 week, 2 weeks, 1 month
-        intervals = [1, 3, 7, 14, 30]
+        if self.vocabulary_manager is None:
+            from vocabulary_manager import VocabularyManager
+            self.vocabulary_manager = VocabularyManager()
         
-        self.data['spaced_repetition'][word_id] = {
-            'word_data': word_data,
-            'review_count': 0,
-            'next_review': (now + timedelta(days=intervals[0])).isoformat(),
-            'intervals': intervals,
-            'last_reviewed': now.isoformat(),
-            'success_rate': 0.0
-        }
+        word_data = self.vocabulary_manager.get_word(word_id)
+        if word_data is None:
+            logger.warning(f"Review word '{word_id}' not found in vocabulary")
+        return word_data
+    
+    def _build_due_heap(self) -> List:
+        """Index all scheduled words by next review time"""
+        heap = [
+            (review_data['next_review'], word_id)
+            for word_id, review_data in self.data['spaced_repetition'].items()
+        ]
+        heapq.heapify(heap)
+        return heap
+    
+    def _push_due(self, next_review_ts: float, word_id: str):
+        """Record a (re)scheduled review; superseded heap entries are dropped lazily"""
+        if self._due_heap is not None:
+            heapq.heappush(self._due_heap, (next_review_ts, word_id))
     
     def get_words_for_review(self) -> List[Dict]:
         """Get words that are due for review today"""
-        now = datetime.now()
+        spaced_repetition = self.data['spaced_repetition']
         due_words = []
+        for word_id in self._due_word_ids(datetime.now().timestamp())[0]:
+            word_data = self._review_word_data(word_id, spaced_repetition[word_id])
+            if word_data is not None:
+                due_words.append(word_data)
+        return due_words
+    
+    def _due_word_ids(self, now_ts: float):
+        """Ids of the words due at now_ts, plus the time the next not-yet-due word comes due"""
+        if self._due_heap is None:
+            self._due_heap = self._build_due_heap()
         
-        for word_id, review_data in self.data['spaced_repetition'].items():
-            next_review = datetime.fromisoformat(review_data['next_review'])
-            if next_review <= now:
-                due_words.append(review_data['word_data'])
+        spaced_repetition = self.data['spaced_repetition']
+        due_entries = []
+        seen = set()
         
-        return due_words
+        while self._due_heap and self._due_heap[0][0] <= now_ts:
+            entry = heapq.heappop(self._due_heap)
+            review_data = spaced_repetition.get(entry[1])
+            # Skip duplicates and entries superseded by a later reschedule
+            if (review_data is not None and entry not in seen and
+                    review_data['next_review'] == entry[0]):
+                seen.add(entry)
+                due_entries.append(entry)
+        
+        # Superseded entries can only make this earlier, which is harmless
+        next_due_ts = self._due_heap[0][0] if self._due_heap else float('inf')
+        
+        # Due words stay due until reviewed, so put them back
+        for entry in due_entries:
+            heapq.heappush(self._due_heap, entry)
+        
+        return [word_id for _, word_id in due_entries], next_due_ts
     
-    def update_review_result(self, word_id: str, success: bool):
+    def update_review_result(self, word_id: str, success: bool,
+                             now: Optional[datetime] = None):
         """Update spaced repetition schedule based on review result"""
         if word_id not in self.data['spaced_repetition']:
             return
         
         review_data = self.data['spaced_repetition'][word_id]
         review_data['review_count'] += 1
-        review_data['last_reviewed'] = datetime.now().isoformat()
         
         # Update success rate
         old_rate = review_data['success_rate']
         count = review_data['review_count']
         review_data['success_rate'] = (old_rate * (count - 1) + (1.0 if success else 0.0)) / count
         
-        # Calculate next review interval
-        intervals = review_data['intervals']
-        current_interval_index = min(review_data['review_count'] - 1, len(intervals) - 1)
+        # Words scheduled with the old fixed intervals start from an estimate
+        if 'stability' not in review_data:
+            interval_days = (review_data['next_review'] - review_data['last_reviewed']) / SECONDS_PER_DAY
+            review_data.update(_SCHEDULER.card_from_interval(interval_days))
+            review_data.pop('intervals', None)
         
-        if success:
-            # Move to next interval if successful
-            next_interval_index = min(current_interval_index + 1, len(intervals) - 1)
-        else:
-            # Reset to first interval if failed
-            next_interval_index = 0
-        
-        next_interval = intervals[next_interval_index]
-        next_review = datetime.now() + timedelta(days=next_interval)
-        review_data['next_review'] = next_review.isoformat()
+        # Let FSRS compute the new memory state and next review time
+        review_data.update(_SCHEDULER.review(review_data, _REVIEW_RATINGS[int(success)], now))
+        self._push_due(review_data['next_review'], word_id)
+        self.mark_dirty()
     
     def should_level_up(self) -> bool:
         """Check if user should progress to next CEFR level"""
         current_level = self.data['current_level']
         level_words = self.data['words_by_level'][current_level]['learned']
         
-        # Level progression criteria
-        level_requirements = {
-            'A1': 50,   # 50 words to move to A2
-            'A2': 100,  # 100 additional words to move to B1
-            'B1': 150,  # 150 additional words to move to B2
-            'B2': 200   # B2 is the target level
-        }
-        
-        if current_level in level_requirements:
-            required_words = level_requirements[current_level]
-            return len(level_words) >= required_words
+        if current_level in _LEVEL_REQS:
+            return len(level_words) >= _LEVEL_REQS[current_level]
         
         return False
     
-    def level_up(self) -> Optional[str]:
+    def level_up(self, now: Optional[datetime] = None) -> Optional[str]:
         """Progress user to next CEFR level"""
-        level_progression = {'A1': 'A2', 'A2': 'B1', 'B1': 'B2'}
         current_level = self.data['current_level']
         
-        if current_level in level_progression:
-            new_level = level_progression[current_level]
+        if current_level in _LEVEL_NEXT:
+            new_level = _LEVEL_NEXT[current_level]
             self.data['current_level'] = new_level
             
             # Add achievement
             achievement = {
                 'type': 'level_up',
                 'level': new_level,
-                'date': datetime.now().isoformat(),
+                'date': (now or datetime.now()).isoformat(),
                 'words_learned': self.data['total_words_learned']
             }
             self.data['achievements'].append(achievement)
+            self.mark_dirty()
             
             logger.info(f"User {self.chat_id} leveled up to {new_level}")
             return new_level
         
         return None
     
-    def update_daily_streak(self, words_learned: List[Dict] = None):
+    def update_daily_streak(self, words_learned: List[Dict] = None,
+                            now: Optional[datetime] = None):
         """Update daily learning streak with advanced tracking"""
+        now = now or datetime.now()
         if self.streak_manager:
             # Use advanced streak manager
-            streak_info = self.streak_manager.update_streak()
+            streak_info = self.streak_manager.update_streak(now.strftime('%Y-%m-%d'))
 
             # Track learning session if analytics available
             if self.learning_analytics and words_learned:
@@ -237,12 +414,12 @@ class UserProgress:
             return streak_info
         else:
             # Fallback to basic streak tracking
-            today = datetime.now().date().isoformat()
+            today_date = now.date()
+            today = today_date.isoformat()
             last_lesson = self.data.get('last_lesson_date')
 
             if last_lesson:
-                last_date = datetime.fromisoformat(last_lesson).date()
-                today_date = datetime.now().date()
+                last_date = _parse_iso_date(last_lesson)
 
                 if last_date == today_date:
                     # Already learned today
@@ -261,14 +438,15 @@ class UserProgress:
                 streak_info = {'streak_continued': True, 'streak_broken': False}
 
             self.data['last_lesson_date'] = today
+            self.mark_dirty()
 
             # Check for streak achievements
             streak = self.data['daily_streak']
-            if streak in [7, 30, 100, 365]:
+            if streak in _STREAK_MILESTONES:
                 achievement = {
                     'type': 'streak',
                     'days': streak,
-                    'date': datetime.now().isoformat()
+                    'date': now.isoformat()
                 }
                 self.data['achievements'].append(achievement)
                 streak_info['milestone_reached'] = streak
@@ -280,8 +458,17 @@ class UserProgress:
         return self.data['current_level']
     
     def get_stats(self) -> Dict:
-        """Get user learning statistics"""
-        return {
+        """Get user learning statistics (cached until the next mutation or due review)"""
+        if self._stats_cache is not None and time.time() < self._stats_expires_at:
+            return self._stats_cache
+        
+        # Counting due ids is enough here; resolving them against the
+        # vocabulary is left to get_words_for_review
+        now_ts = time.time()
+        due_word_ids, next_due_ts = self._due_word_ids(now_ts)
+        self._stats_expires_at = min(next_due_ts, _next_midnight_ts(now_ts))
+        self._advanced_stats_cache = None
+        self._stats_cache = {
             'current_level': self.data['current_level'],
             'total_words_learned': self.data['total_words_learned'],
             'daily_streak': self.data['daily_streak'],
@@ -290,8 +477,9 @@ class UserProgress:
                 for level, data in self.data['words_by_level'].items()
             },
             'achievements_count': len(self.data['achievements']),
-            'words_due_for_review': len(self.get_words_for_review())
+            'words_due_for_review': len(due_word_ids)
         }
+        return self._stats_cache
     
     def get_preferences(self) -> Dict:
         """Get user preferences"""
@@ -300,11 +488,14 @@ class UserProgress:
     def update_preferences(self, preferences: Dict):
         """Update user preferences"""
         self.data['preferences'].update(preferences)
-        self.save_progress()
+        self.mark_dirty()
 
     def get_advanced_stats(self) -> Dict:
-        """Get comprehensive learning statistics with analytics"""
-        basic_stats = self.get_stats()
+        """Get comprehensive learning statistics with analytics (cached like get_stats)"""
+        if self._advanced_stats_cache is not None and time.time() < self._stats_expires_at:
+            return self._advanced_stats_cache
+        
+        basic_stats = dict(self.get_stats())
 
         if self.streak_manager:
             streak_stats = self.streak_manager.get_streak_stats()
@@ -317,6 +508,7 @@ class UserProgress:
             predictive = self.learning_analytics.get_predictive_insights()
             basic_stats['predictive_insights'] = predictive
 
+        self._advanced_stats_cache = basic_stats
         return basic_stats
 
     def get_streak_message(self, streak_info: Dict) -> str:
@@ -334,7 +526,7 @@ class UserProgress:
             else:
                 return "📚 Keep learning!"
 
-    def track_quiz_performance(self, quiz_results: Dict):
+    def track_quiz_performance(self, quiz_results: Dict, now: Optional[datetime] = None):
         """Track quiz performance for analytics"""
         if self.learning_analytics:
             self.learning_analytics.track_quiz_performance(quiz_results)
@@ -342,9 +534,11 @@ class UserProgress:
 
         # Also add to basic quiz scores
         self.data['quiz_scores'].append({
-            'date': datetime.now().isoformat(),
+            'date': (now or datetime.now()).isoformat(),
             'score': quiz_results.get('score', 0),
             'total': quiz_results.get('total', 0),
             'percentage': quiz_results.get('percentage', 0)
         })
-        self.save_progress()
+        if len(self.data['quiz_scores']) > HISTORY_LIMIT:
+            del self.data['quiz_scores'][:-HISTORY_LIMIT]
+        self.mark_dirty()
@@ -5,47 +5,66 @@ Validate the words.json file structure and content
 
 import json
 import sys
+from collections import Counter
+from operator import itemgetter
+from config import loads_json
+
+# ijson lets the vocabulary be validated without holding the whole file in memory
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+    JSON_ERRORS = (json.JSONDecodeError, ijson.JSONError)
+except ImportError:
+    IJSON_AVAILABLE = False
+    JSON_ERRORS = (json.JSONDecodeError,)
+
+def iter_words_file(f):
+    """Iterate the entries of an open (binary) vocabulary file"""
+    if IJSON_AVAILABLE:
+        return ijson.items(f, 'item')
+    return iter(loads_json(f.read()))
 
 def validate_words():
     """Validate the words.json file"""
     try:
-        with open('words.json', 'r', encoding='utf-8') as f:
-            words = json.load(f)
-        
-        print(f"✅ Successfully loaded {len(words)} words from words.json")
-        
         # Check structure
         required_fields = ['german', 'english', 'pronunciation', 'example', 'example_translation', 'category']
+        get_required = itemgetter(*required_fields)
+        categories = Counter()
+        word_count = 0
         
-        for i, word in enumerate(words):
-            for field in required_fields:
-                if field not in word:
-                    print(f"❌ Word {i+1} missing field: {field}")
+        with open('words.json', 'rb') as f:
+            for i, word in enumerate(iter_words_file(f)):
+                try:
+                    values = get_required(word)
+                except KeyError as e:
+                    print(f"❌ Word {i+1} missing field: {e.args[0]}")
                     return False
-                if not word[field] or not isinstance(word[field], str):
-                    print(f"❌ Word {i+1} has invalid {field}: {word[field]}")
+                if not all(isinstance(value, str) and value for value in values):
+                    field, value = next((f, v) for f, v in zip(required_fields, values)
+                                        if not (isinstance(v, str) and v))
+                    print(f"❌ Word {i+1} has invalid {field}: {value}")
                     return False
+                # Count categories
+                categories[word['category']] += 1
+                word_count += 1
         
-        # Count categories
-        categories = {}
-        for word in words:
-            cat = word['category']
-            categories[cat] = categories.get(cat, 0) + 1
+        print(f"✅ Successfully loaded {word_count} words from words.json")
         
         print(f"\n📊 Word distribution by category:")
-        for cat, count in sorted(categories.items()):
+        for cat, count in categories.most_common():
             print(f"  {cat}: {count} words")
         
         print(f"\n🎯 Total categories: {len(categories)}")
-        print(f"🎯 Average words per category: {len(words) / len(categories):.1f}")
+        print(f"🎯 Average words per category: {word_count / len(categories):.1f}")
         
         # Check for enough words for daily lessons
-        days_of_content = len(words) // 3  # Assuming 3 words per day
+        days_of_content = word_count // 3  # Assuming 3 words per day
         print(f"\n📅 Content available for approximately {days_of_content} days")
         
-        if len(words) >= 365:
+        if word_count >= 365:
             print("✅ Enough words for a full year!")
-        elif len(words) >= 100:
+        elif word_count >= 100:
             print("✅ Good vocabulary base!")
         else:
             print("⚠️  Consider adding more words for better variety")
@@ -55,7 +74,7 @@ def validate_words():
     except FileNotFoundError:
         print("❌ words.json file not found")
         return False
-    except json.JSONDecodeError as e:
+    except JSON_ERRORS as e:
         print(f"❌ Invalid JSON in words.json: {e}")
         return False
     except Exception as e:
@@ -5,30 +5,39 @@ Verifies that the German Daily Words Bot is properly deployed and configured
 """
 
 import os
+import re
 import json
-import requests
+import importlib
+import importlib.util
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from dotenv import load_dotenv
-
-load_dotenv()
+from config import API_URL_TEMPLATE, BOT_TOKEN_RE, create_session, get_bot_token, response_json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_SCHEDULE_MARKER = b"cron: '0 9 * * *'"
+_RUN_MARKER = b"python multi_user_bot.py"
+_WORKFLOW_MARKERS = re.compile(re.escape(_SCHEDULE_MARKER) + b"|" + re.escape(_RUN_MARKER))
+
 class GitHubDeploymentVerifier:
     def __init__(self):
-        self.bot_token = os.getenv('BOT_TOKEN')
+        self.bot_token = get_bot_token()
         if not self.bot_token:
             raise ValueError("BOT_TOKEN environment variable is required")
+        # Fail fast on a malformed token instead of spending a round trip on getMe
+        if not BOT_TOKEN_RE.match(self.bot_token):
+            raise ValueError("BOT_TOKEN is malformed (expected '<bot id>:<35-character secret>')")
         
-        self.api_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.api_url = API_URL_TEMPLATE.format(self.bot_token)
+        self.session = create_session()
         
     def verify_bot_connection(self):
         """Verify bot can connect to Telegram API"""
         try:
-            response = requests.get(f"{self.api_url}/getMe", timeout=10)
-            data = response.json()
+            response = self.session.get(f"{self.api_url}/getMe", timeout=10)
+            data = response_json(response)
             
             if data['ok']:
                 bot_info = data['result']
@@ -48,27 +57,29 @@ class GitHubDeploymentVerifier:
         """Verify GitHub Actions workflow files exist"""
         workflow_file = ".github/workflows/daily_word.yml"
         
-        if os.path.exists(workflow_file):
-            logger.info(f"✅ GitHub Actions workflow found: {workflow_file}")
-            
-            # Check workflow content
-            with open(workflow_file, 'r') as f:
+        try:
+            with open(workflow_file, 'rb') as f:
                 content = f.read()
-                
-            if 'cron: \'0 9 * * *\'' in content:
-                logger.info("✅ Daily schedule configured (9:00 AM UTC)")
-            else:
-                logger.warning("⚠️  Daily schedule not found in workflow")
-                
-            if 'python multi_user_bot.py' in content:
-                logger.info("✅ Multi-user bot execution configured")
-            else:
-                logger.warning("⚠️  Multi-user bot execution not found")
-                
-            return True
-        else:
+        except FileNotFoundError:
             logger.error(f"❌ GitHub Actions workflow not found: {workflow_file}")
             return False
+        
+        logger.info(f"✅ GitHub Actions workflow found: {workflow_file}")
+        
+        # Check workflow content in a single pass over the raw bytes
+        found = set(_WORKFLOW_MARKERS.findall(content))
+        
+        if _SCHEDULE_MARKER in found:
+            logger.info("✅ Daily schedule configured (9:00 AM UTC)")
+        else:
+            logger.warning("⚠️  Daily schedule not found in workflow")
+            
+        if _RUN_MARKER in found:
+            logger.info("✅ Multi-user bot execution configured")
+        else:
+            logger.warning("⚠️  Multi-user bot execution not found")
+            
+        return True
     
     def verify_bot_files(self):
         """Verify all required bot files exist"""
@@ -81,13 +92,18 @@ class GitHubDeploymentVerifier:
             'requirements.txt'
         ]
         
-        missing_files = []
-        for file in required_files:
-            if os.path.exists(file):
-                logger.info(f"✅ Required file found: {file}")
-            else:
-                logger.error(f"❌ Missing required file: {file}")
-                missing_files.append(file)
+        # One directory listing instead of a stat call per file
+        with os.scandir('.') as entries:
+            present = {entry.name for entry in entries}
+        
+        found_files = [file for file in required_files if file in present]
+        missing_files = [file for file in required_files if file not in present]
+        
+        # One log record per outcome rather than one per file
+        if found_files:
+            logger.info(f"✅ Required files found: {', '.join(found_files)}")
+        if missing_files:
+            logger.error(f"❌ Missing required files: {', '.join(missing_files)}")
         
         return len(missing_files) == 0
     
@@ -111,10 +127,29 @@ class GitHubDeploymentVerifier:
         """Test individual workflow components"""
         logger.info("🧪 Testing workflow components...")
         
+        components = [
+            ('handle_new_users', 'User registration handler'),
+            ('multi_user_bot', 'Multi-user bot'),
+            ('vocabulary_manager', 'Vocabulary manager')
+        ]
+        
+        # Skip modules that aren't on the path instead of paying for a failed import
+        missing = [module for module, _ in components if importlib.util.find_spec(module) is None]
+        for module, label in components:
+            if module in missing:
+                logger.error(f"❌ {label} failed: module {module} not found")
+        if missing:
+            return False
+        
+        # Import concurrently; construction below stays sequential since the
+        # components may share module-level state
+        with ThreadPoolExecutor(max_workers=len(components)) as executor:
+            imports = {module: executor.submit(importlib.import_module, module)
+                       for module, _ in components}
+        
         # Test user registration handler
         try:
-            from handle_new_users import UserRegistrationHandler
-            handler = UserRegistrationHandler()
+            handler = imports['handle_new_users'].result().UserRegistrationHandler()
             logger.info("✅ User registration handler: OK")
         except Exception as e:
             logger.error(f"❌ User registration handler failed: {e}")
@@ -122,8 +157,7 @@ class GitHubDeploymentVerifier:
         
         # Test multi-user bot
         try:
-            from multi_user_bot import MultiUserGermanBot
-            bot = MultiUserGermanBot()
+            bot = imports['multi_user_bot'].result().MultiUserGermanBot()
             logger.info("✅ Multi-user bot: OK")
         except Exception as e:
             logger.error(f"❌ Multi-user bot failed: {e}")
@@ -131,8 +165,7 @@ class GitHubDeploymentVerifier:
         
         # Test vocabulary manager
         try:
-            from vocabulary_manager import VocabularyManager
-            vocab = VocabularyManager()
+            vocab = imports['vocabulary_manager'].result().VocabularyManager()
             word_count = len(vocab.words)
             logger.info(f"✅ Vocabulary manager: OK ({word_count} words loaded)")
         except Exception as e:
@@ -147,13 +180,16 @@ class GitHubDeploymentVerifier:
         logger.info("🚀 GITHUB DEPLOYMENT VERIFICATION REPORT")
         logger.info("=" * 60)
         
-        results = {
-            'bot_connection': self.verify_bot_connection(),
-            'github_actions': self.verify_github_actions_files(),
-            'bot_files': self.verify_bot_files(),
-            'user_database': self.verify_user_database(),
-            'workflow_components': self.test_workflow_components()
-        }
+        try:
+            results = {
+                'bot_connection': self.verify_bot_connection(),
+                'github_actions': self.verify_github_actions_files(),
+                'bot_files': self.verify_bot_files(),
+                'user_database': self.verify_user_database(),
+                'workflow_components': self.test_workflow_components()
+            }
+        finally:
+            self.session.close()
         
         logger.info("\n📊 VERIFICATION RESULTS:")
         logger.info("-" * 40)
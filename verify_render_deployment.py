@@ -4,15 +4,17 @@ Render Deployment Verification Script
 Comprehensive testing of German Daily Words Bot deployment on Render
 """
 
-import os
+import sys
 import json
 import time
-import requests
+import importlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from dotenv import load_dotenv
-
-load_dotenv()
+from config import (
+    API_URL_TEMPLATE, BOT_TOKEN_RE, create_session, get_bot_token, response_json, webhook_params
+)
+from thread_output import ThreadOutput
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,12 +25,17 @@ logger = logging.getLogger(__name__)
 
 class RenderDeploymentVerifier:
     def __init__(self):
-        self.bot_token = os.getenv('BOT_TOKEN')
+        self.bot_token = get_bot_token()
         self.webhook_url = None  # Will be set based on Render URL
-        self.api_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.api_url = API_URL_TEMPLATE.format(self.bot_token)
         
         if not self.bot_token:
             raise ValueError("BOT_TOKEN must be set in environment variables")
+        # Fail fast on a malformed token instead of spending a round trip on getMe
+        if not BOT_TOKEN_RE.match(self.bot_token):
+            raise ValueError("BOT_TOKEN is malformed (expected '<bot id>:<35-character secret>')")
+        
+        self.session = create_session()
         
         print("🚀 RENDER DEPLOYMENT VERIFICATION")
         print("=" * 50)
@@ -40,10 +47,10 @@ class RenderDeploymentVerifier:
         """Test basic bot API connection"""
         print("\n🔍 TESTING BOT CONNECTION...")
         try:
-            response = requests.get(f"{self.api_url}/getMe", timeout=10)
+            response = self.session.get(f"{self.api_url}/getMe", timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
+                data = response_json(response)
                 if data['ok']:
                     bot_info = data['result']
                     print(f"✅ Bot connected successfully!")
@@ -64,10 +71,10 @@ class RenderDeploymentVerifier:
         print(f"\n🌐 TESTING WEBHOOK SERVER: {render_url}")
         try:
             # Test health endpoint
-            health_response = requests.get(f"{render_url}/", timeout=10)
+            health_response = self.session.get(f"{render_url}/", timeout=10)
             
             if health_response.status_code == 200:
-                health_data = health_response.json()
+                health_data = response_json(health_response)
                 print("✅ Webhook server is running!")
                 print(f"   Status: {health_data.get('status')}")
                 print(f"   Message: {health_data.get('message')}")
@@ -87,14 +94,14 @@ class RenderDeploymentVerifier:
         webhook_url = f"{render_url}/webhook"
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/setWebhook",
-                data={'url': webhook_url},
+                data=webhook_params(webhook_url),
                 timeout=10
             )
             
             if response.status_code == 200:
-                data = response.json()
+                data = response_json(response)
                 if data['ok']:
                     print(f"✅ Webhook set successfully!")
                     print(f"   Webhook URL: {webhook_url}")
@@ -112,10 +119,10 @@ class RenderDeploymentVerifier:
         """Get current webhook information"""
         print(f"\n📡 CHECKING WEBHOOK STATUS...")
         try:
-            response = requests.get(f"{self.api_url}/getWebhookInfo", timeout=10)
+            response = self.session.get(f"{self.api_url}/getWebhookInfo", timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
+                data = response_json(response)
                 if data['ok']:
                     webhook_info = data['result']
                     print("✅ Webhook information retrieved!")
@@ -149,16 +156,26 @@ class RenderDeploymentVerifier:
         
         successful_imports = 0
         
-        for module_name in modules_to_test:
+        # Imports are independent, so load them concurrently and report in order
+        with ThreadPoolExecutor(max_workers=len(modules_to_test)) as executor:
+            futures = [
+                (module_name, executor.submit(importlib.import_module, module_name))
+                for module_name in modules_to_test
+            ]
+        
+        # Build the report first and print it in one call
+        lines = []
+        for module_name, future in futures:
             try:
-                __import__(module_name)
-                print(f"   ✅ {module_name}")
+                future.result()
+                lines.append(f"   ✅ {module_name}")
                 successful_imports += 1
             except ImportError as e:
-                print(f"   ❌ {module_name}: {e}")
+                lines.append(f"   ❌ {module_name}: {e}")
         
         success_rate = (successful_imports / len(modules_to_test)) * 100
-        print(f"\n📊 Module Import Success Rate: {success_rate:.1f}% ({successful_imports}/{len(modules_to_test)})")
+        lines.append(f"\n📊 Module Import Success Rate: {success_rate:.1f}% ({successful_imports}/{len(modules_to_test)})")
+        print("\n".join(lines))
         
         return success_rate >= 80  # 80% success rate required
     
@@ -207,28 +224,50 @@ class RenderDeploymentVerifier:
         print("🎯 STARTING COMPREHENSIVE DEPLOYMENT VERIFICATION")
         print("=" * 60)
         
-        results = {}
+        # Setting the webhook needs the server to be up and the webhook info
+        # should reflect the new URL, so those three steps run in sequence
+        # while the remaining independent checks run alongside them
+        def webhook_checks():
+            server_ok = self.test_webhook_server(render_url)
+            setup_ok = self.set_webhook(render_url)
+            info_ok, info = self.get_webhook_info()
+            return server_ok, setup_ok, info_ok, info
         
-        # Test 1: Bot Connection
-        results['bot_connection'], bot_info = self.test_bot_connection()
-        
-        # Test 2: Webhook Server
-        results['webhook_server'] = self.test_webhook_server(render_url)
-        
-        # Test 3: Set Webhook
-        results['webhook_setup'] = self.set_webhook(render_url)
-        
-        # Test 4: Webhook Info
-        results['webhook_info'], webhook_data = self.get_webhook_info()
+        output = ThreadOutput(sys.stdout)
+        sys.stdout = output
+        try:
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                futures = [
+                    executor.submit(output.capture, check) for check in (
+                        self.test_bot_connection,
+                        webhook_checks,
+                        self.test_bot_modules,
+                        self.test_vocabulary_database,
+                        self.simulate_user_interaction
+                    )
+                ]
+        finally:
+            sys.stdout = output.stream
+            self.session.close()
         
-        # Test 5: Bot Modules
-        results['bot_modules'] = self.test_bot_modules()
+        outcomes = []
+        for future in futures:
+            result, printed = future.result()
+            print(printed, end='')
+            outcomes.append(result)
         
-        # Test 6: Vocabulary Database
-        results['vocabulary_db'] = self.test_vocabulary_database()
+        (bot_connection, bot_info), webhook, bot_modules, vocabulary_db, user_interaction = outcomes
+        webhook_server, webhook_setup, webhook_info, webhook_data = webhook
         
-        # Test 7: User Interaction Simulation
-        results['user_interaction'] = self.simulate_user_interaction()
+        results = {
+            'bot_connection': bot_connection,
+            'webhook_server': webhook_server,
+            'webhook_setup': webhook_setup,
+            'webhook_info': webhook_info,
+            'bot_modules': bot_modules,
+            'vocabulary_db': vocabulary_db,
+            'user_interaction': user_interaction
+        }
         
         # Generate Report
         self.generate_verification_report(results, bot_info, webhook_data)
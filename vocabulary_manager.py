@@ -5,25 +5,86 @@ Handles CEFR level progression, word selection, and learning optimization
 """
 
 import json
+import os
 import random
+from collections import Counter, defaultdict
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
 import logging
 
+from config import loads_json
+
 logger = logging.getLogger(__name__)
 
+# Grammar tips keyed by the dominant word type of a selection
+GRAMMAR_TIPS = {
+    'noun': [
+        "🔤 German nouns are always capitalized and have grammatical gender (der/die/das).",
+        "📝 Tip: Learn the article with the noun - 'der Hund', 'die Katze', 'das Haus'.",
+        "🎯 German has four cases: Nominativ, Akkusativ, Dativ, Genitiv. Start with Nominativ!"
+    ],
+    'verb': [
+        "🔄 German verbs change their endings based on who is doing the action.",
+        "📚 Regular verbs follow patterns: ich lerne, du lernst, er/sie/es lernt.",
+        "⚡ Separable verbs split in sentences: 'Ich stehe um 7 Uhr auf' (aufstehen)."
+    ],
+    'adjective': [
+        "🎨 German adjectives change endings when used before nouns.",
+        "📏 Adjective endings depend on gender, case, and article type.",
+        "💡 After 'sein' (to be), adjectives don't change: 'Das Haus ist groß'."
+    ]
+}
+
+# Default grammar tips
+GENERAL_GRAMMAR_TIPS = [
+    "🇩🇪 German word order: Subject-Verb-Object in main clauses.",
+    "📖 Practice makes perfect! Try to use new words in your own sentences.",
+    "🎵 German pronunciation is quite regular - what you see is what you say!",
+    "🔗 Connect new words to words you already know to build vocabulary networks."
+]
+
+# Fields every vocabulary entry must have (in reporting order)
+_REQUIRED_FIELDS = ('german', 'english', 'pronunciation', 'example',
+                    'example_translation', 'category', 'level')
+
+# Map themes to categories
+THEME_MAPPING = {
+    'daily_life': ['food_drink', 'home', 'family', 'time'],
+    'travel': ['transport', 'directions', 'accommodation', 'weather'],
+    'business': ['work', 'office', 'meetings', 'technology'],
+    'social': ['greetings', 'politeness', 'emotions', 'relationships']
+}
+
+# Reverse lookup: category -> themes that include it
+_CATEGORY_THEMES = defaultdict(tuple)
+for _theme, _categories in THEME_MAPPING.items():
+    for _category in _categories:
+        _CATEGORY_THEMES[_category] += (_theme,)
+_CATEGORY_THEMES = dict(_CATEGORY_THEMES)
+
+@lru_cache(maxsize=4)
+def _load_words_cached(path: str, mtime: float) -> List[Dict]:
+    """Parse a vocabulary file; the mtime key makes edits to the file invalidate the cache"""
+    with open(path, 'rb') as f:
+        return loads_json(f.read())
+
 class VocabularyManager:
     def __init__(self, words_file: str = 'words.json'):
         self.words_file = words_file
         self.words = self.load_words()
-        self.words_by_level = self.organize_by_level()
-        self.words_by_category = self.organize_by_category()
+        self._index_words()
+        self._missing_fields = None  # Filled on first validate_database call
+        self.words_by_german = {word['german']: word for word in self.words}
     
     def load_words(self) -> List[Dict]:
         """Load vocabulary database from JSON file"""
         try:
-            with open(self.words_file, 'r', encoding='utf-8') as f:
-                words = json.load(f)
+            # Parsed once per file version and shared by every instance;
+            # each manager gets its own copies since callers fill in fields
+            # such as 'level' on the word dicts
+            cached = _load_words_cached(self.words_file, os.stat(self.words_file).st_mtime)
+            words = [dict(word) for word in cached]
             logger.info(f"Loaded {len(words)} words from vocabulary database")
             return words
         except FileNotFoundError:
@@ -33,43 +94,51 @@ class VocabularyManager:
             logger.error(f"Error parsing {self.words_file}: {e}")
             raise
     
-    def organize_by_level(self) -> Dict[str, List[Dict]]:
-        """Organize words by CEFR level"""
-        levels = {'A1': [], 'A2': [], 'B1': [], 'B2': []}
-        
-        for word in self.words:
-            level = word.get('level', 'A1')  # Default to A1 if no level specified
-            if level in levels:
-                levels[level].append(word)
-        
-        logger.info(f"Words by level: {[(level, len(words)) for level, words in levels.items()]}")
-        return levels
-    
-    def organize_by_category(self) -> Dict[str, List[Dict]]:
-        """Organize words by category"""
-        categories = {}
+    def _index_words(self):
+        """Group words by CEFR level and by category in a single pass"""
+        words_by_level = defaultdict(list, {level: [] for level in ('A1', 'A2', 'B1', 'B2')})
+        words_by_category = defaultdict(list)
+        theme_level_index = defaultdict(list)
         
         for word in self.words:
+            words_by_level[word.get('level', 'A1')].append(word)  # Default to A1 if no level specified
             category = word.get('category', 'general')
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(word)
+            words_by_category[category].append(word)
+            for theme in _CATEGORY_THEMES.get(category, ()):
+                theme_level_index[(theme, word.get('level'))].append(word)
+        
+        # Plain dicts so lookups of unknown keys don't add empty entries
+        self.words_by_level = dict(words_by_level)
+        self.words_by_category = dict(words_by_category)
+        self._theme_level_index = dict(theme_level_index)
+        self._level_counts = {level: len(words) for level, words in self.words_by_level.items()}
+        self._category_counts = {cat: len(words) for cat, words in self.words_by_category.items()}
+        
+        # Frequency order (lower number = more common/important) never changes
+        # at runtime, so sort each level once instead of on every selection
+        self._sorted_by_level = {
+            level: sorted(words, key=lambda w: w.get('frequency', 999))
+            for level, words in self.words_by_level.items()
+        }
         
-        return categories
+        logger.info(f"Words by level: {[(level, len(words)) for level, words in self.words_by_level.items()]}")
+    
+    def get_word(self, german: str) -> Optional[Dict]:
+        """Look up a vocabulary entry by its German word"""
+        return self.words_by_german.get(german)
     
     def get_words_for_level(self, level: str, count: int, 
-                           exclude_words: List[str] = None,
+                           exclude_words: Optional[Iterable[str]] = None,
                            preferred_categories: List[str] = None) -> List[Dict]:
         """Get words for specific CEFR level with smart selection"""
         if level not in self.words_by_level:
             logger.warning(f"Level {level} not found, defaulting to A1")
             level = 'A1'
         
-        available_words = self.words_by_level[level].copy()
-        exclude_words = exclude_words or []
+        exclude = exclude_words if isinstance(exclude_words, (set, frozenset)) else set(exclude_words or ())
         
-        # Filter out already learned words
-        available_words = [w for w in available_words if w['german'] not in exclude_words]
+        # Filter out already learned words; filtering keeps the presorted frequency order
+        available_words = [w for w in self._sorted_by_level[level] if w['german'] not in exclude]
         
         if not available_words:
             logger.warning(f"No available words for level {level}")
@@ -81,19 +150,15 @@ class VocabularyManager:
             if preferred_words:
                 available_words = preferred_words
         
-        # Sort by frequency (lower number = more common/important)
-        available_words.sort(key=lambda x: x.get('frequency', 999))
-        
         # Select words with some randomization but bias toward high-frequency words
         selected_words = []
         
         # Take top 50% most frequent words for selection pool
-        pool_size = max(count * 3, len(available_words) // 2)
-        selection_pool = available_words[:pool_size]
+        pool_size = min(max(count * 3, len(available_words) // 2), len(available_words))
         
-        # Randomly select from the pool
-        selected_count = min(count, len(selection_pool))
-        selected_words = random.sample(selection_pool, selected_count)
+        # Randomly select from the pool by index, without slicing it out
+        selected_count = min(count, pool_size)
+        selected_words = [available_words[i] for i in random.sample(range(pool_size), selected_count)]
         
         logger.info(f"Selected {len(selected_words)} words for level {level}")
         return selected_words
@@ -101,7 +166,7 @@ class VocabularyManager:
     def get_progressive_words(self, user_level: str, count: int, 
                             learned_words: List[str] = None) -> List[Dict]:
         """Get words with progressive difficulty mixing"""
-        learned_words = learned_words or []
+        learned_set = set(learned_words or ())
         
         # Progressive mixing strategy
         level_distribution = {
@@ -120,7 +185,7 @@ class VocabularyManager:
         for level, ratio in distribution.items():
             level_count = max(1, int(count * ratio))
             level_words = self.get_words_for_level(
-                level, level_count, learned_words
+                level, level_count, learned_set
             )
             selected_words.extend(level_words)
         
@@ -128,15 +193,13 @@ class VocabularyManager:
         if len(selected_words) > count:
             selected_words = selected_words[:count]
         
-        # Fill up to count if we're short
-        while len(selected_words) < count:
-            additional_words = self.get_words_for_level(
-                user_level, count - len(selected_words), 
-                learned_words + [w['german'] for w in selected_words]
-            )
-            if not additional_words:
-                break
-            selected_words.extend(additional_words)
+        # Fill up to count if we're short; one call already returns as many
+        # words as the level has left, so a shorter result is final
+        shortfall = count - len(selected_words)
+        if shortfall > 0:
+            selected_words.extend(self.get_words_for_level(
+                user_level, shortfall, learned_set | {w['german'] for w in selected_words}
+            ))
         
         return selected_words[:count]
     
@@ -150,27 +213,16 @@ class VocabularyManager:
         # Prioritize words that haven't been reviewed recently
         # For now, just random selection
         review_count = min(count, len(review_candidates))
-        return random.sample(review_candidates, review_count)
+        return [review_candidates[i] for i in random.sample(range(len(review_candidates)), review_count)]
     
     def get_thematic_words(self, theme: str, level: str, count: int) -> List[Dict]:
         """Get words for specific theme/topic"""
-        theme_words = []
-        
-        # Map themes to categories
-        theme_mapping = {
-            'daily_life': ['food_drink', 'home', 'family', 'time'],
-            'travel': ['transport', 'directions', 'accommodation', 'weather'],
-            'business': ['work', 'office', 'meetings', 'technology'],
-            'social': ['greetings', 'politeness', 'emotions', 'relationships']
-        }
-        
-        categories = theme_mapping.get(theme, [theme])
-        
-        for category in categories:
-            if category in self.words_by_category:
-                category_words = [w for w in self.words_by_category[category] 
-                                if w.get('level') == level]
-                theme_words.extend(category_words)
+        if theme in THEME_MAPPING:
+            theme_words = self._theme_level_index.get((theme, level), [])
+        else:
+            # Unknown themes are treated as a single category
+            theme_words = [w for w in self.words_by_category.get(theme, [])
+                           if w.get('level') == level]
         
         if not theme_words:
             # Fallback to regular level-based selection
@@ -186,70 +238,35 @@ class VocabularyManager:
         # Analyze word types in the selection
         word_types = [w.get('word_type', 'unknown') for w in words]
         
-        grammar_tips = {
-            'noun': [
-                "🔤 German nouns are always capitalized and have grammatical gender (der/die/das).",
-                "📝 Tip: Learn the article with the noun - 'der Hund', 'die Katze', 'das Haus'.",
-                "🎯 German has four cases: Nominativ, Akkusativ, Dativ, Genitiv. Start with Nominativ!"
-            ],
-            'verb': [
-                "🔄 German verbs change their endings based on who is doing the action.",
-                "📚 Regular verbs follow patterns: ich lerne, du lernst, er/sie/es lernt.",
-                "⚡ Separable verbs split in sentences: 'Ich stehe um 7 Uhr auf' (aufstehen)."
-            ],
-            'adjective': [
-                "🎨 German adjectives change endings when used before nouns.",
-                "📏 Adjective endings depend on gender, case, and article type.",
-                "💡 After 'sein' (to be), adjectives don't change: 'Das Haus ist groß'."
-            ]
-        }
-        
         # Find the most common word type
-        most_common_type = max(set(word_types), key=word_types.count) if word_types else 'noun'
+        most_common_type = Counter(word_types).most_common(1)[0][0] if word_types else 'noun'
         
-        if most_common_type in grammar_tips:
-            return random.choice(grammar_tips[most_common_type])
+        if most_common_type in GRAMMAR_TIPS:
+            return random.choice(GRAMMAR_TIPS[most_common_type])
         
-        # Default grammar tips
-        general_tips = [
-            "🇩🇪 German word order: Subject-Verb-Object in main clauses.",
-            "📖 Practice makes perfect! Try to use new words in your own sentences.",
-            "🎵 German pronunciation is quite regular - what you see is what you say!",
-            "🔗 Connect new words to words you already know to build vocabulary networks."
-        ]
-        
-        return random.choice(general_tips)
+        return random.choice(GENERAL_GRAMMAR_TIPS)
     
     def validate_database(self) -> Dict[str, any]:
         """Validate vocabulary database structure and content"""
-        required_fields = ['german', 'english', 'pronunciation', 'example', 
-                          'example_translation', 'category', 'level']
+        # The word list is static, so the per-word field check only runs once
+        if self._missing_fields is None:
+            self._missing_fields = [
+                f"Word {i+1}: missing {field}"
+                for i, word in enumerate(self.words)
+                for field in _REQUIRED_FIELDS
+                if not word.get(field)
+            ]
         
-        validation_results = {
+        return {
             'total_words': len(self.words),
-            'missing_fields': [],
-            'level_distribution': {},
-            'category_distribution': {},
+            'missing_fields': list(self._missing_fields),
+            'level_distribution': {
+                level: self._level_counts.get(level, 0) for level in ('A1', 'A2', 'B1', 'B2')
+            },
+            'category_distribution': dict(self._category_counts),
             'errors': []
         }
-        
-        # Count level distribution
-        for level in ['A1', 'A2', 'B1', 'B2']:
-            validation_results['level_distribution'][level] = len(self.words_by_level.get(level, []))
-        
-        # Count category distribution
-        validation_results['category_distribution'] = {
-            cat: len(words) for cat, words in self.words_by_category.items()
-        }
-        
-        # Check for missing fields
-        for i, word in enumerate(self.words):
-            for field in required_fields:
-                if field not in word or not word[field]:
-                    validation_results['missing_fields'].append(f"Word {i+1}: missing {field}")
-        
-        return validation_results
 
     def get_available_levels(self) -> List[str]:
         """Get list of available CEFR levels"""
-        return list(self.words_by_level.keys())
+        return list(self._level_counts)
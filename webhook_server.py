@@ -2,13 +2,43 @@
 """
 Webhook Server for Telegram Bot (Alternative to Polling)
 Use this for production deployment with a web server
+
+Running this file serves the app through uvicorn when uvicorn and asgiref
+are installed, falling back to the threaded Flask server otherwise. The WSGI
+app can also be served directly, e.g.:
+    gunicorn -w 1 --threads 8 webhook_server:app
+Use a single worker process: the per-chat update queues and the progress
+files they write are only coordinated within one process.
 """
 
 import os
+import hmac
+import atexit
 import json
+import time
 import logging
-from flask import Flask, request, jsonify
-from dotenv import load_dotenv
+import threading
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, Response, request
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
+from config import (
+    API_URL_TEMPLATE, ORJSON_AVAILABLE, get_bot_token, get_webhook_secret, loads_json, orjson,
+    webhook_params
+)
+
+# uvicorn + asgiref are optional; they serve the app as ASGI in production
+try:
+    import uvicorn
+    from asgiref.sync import ThreadSensitiveContext
+    from asgiref.wsgi import WsgiToAsgi
+    ASGI_AVAILABLE = True
+except ImportError:
+    ASGI_AVAILABLE = False
 
 # Import bot handler
 try:
@@ -18,7 +48,7 @@ except ImportError as e:
     print(f"❌ Bot handler not available: {e}")
     BOT_HANDLER_AVAILABLE = False
 
-load_dotenv()
+BOT_TOKEN = get_bot_token()
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,71 +57,414 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+if not BOT_TOKEN:
+    logger.error("BOT_TOKEN is not set; /set_webhook will refuse requests")
+
+# Identical log lines within this window are dropped, so a flood of bad
+# requests or Telegram retries can't amplify into a flood of log output
+LOG_DEDUPE_WINDOW = float(os.getenv('LOG_DEDUPE_WINDOW', 1.0))
+
+_recent_logs = {}  # (level, msg, args) -> [last emitted at, suppressed count]
+_recent_logs_lock = threading.Lock()
+
+def _log_deduped(level, msg, *args):
+    """Log with lazy formatting, skipping repeats within LOG_DEDUPE_WINDOW"""
+    if not logger.isEnabledFor(level):
+        return
+    
+    key = (level, msg, tuple(str(arg) for arg in args))
+    now = time.monotonic()
+    with _recent_logs_lock:
+        entry = _recent_logs.get(key)
+        if entry is not None and now - entry[0] < LOG_DEDUPE_WINDOW:
+            entry[1] += 1
+            return
+        suppressed = entry[1] if entry is not None else 0
+        _recent_logs[key] = [now, 0]
+        if len(_recent_logs) > 256:
+            # Forget stale entries so distinct messages can't grow this forever
+            for stale in [k for k, v in _recent_logs.items() if now - v[0] >= LOG_DEDUPE_WINDOW]:
+                del _recent_logs[stale]
+    
+    if suppressed:
+        msg += " (%d similar messages suppressed)"
+        args += (suppressed,)
+    logger.log(level, msg, *args, exc_info=logger.isEnabledFor(logging.DEBUG))
+
+# The setWebhook call only varies in the URL, so build everything else once.
+# Only message updates are handled, so Telegram needn't deliver anything else
+_SET_WEBHOOK_URL = f"{API_URL_TEMPLATE.format(BOT_TOKEN)}/setWebhook" if BOT_TOKEN else None
+_WEBHOOK_OPTIONS = {
+    'max_connections': 100,
+    'allowed_updates': json.dumps(['message'])
+}
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__)
 
+# Accept '/webhook/' without a redirect round trip
+app.url_map.strict_slashes = False
+
+# One access log line per Telegram update is noise; keep warnings and errors
+logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
+else:
+    app.json.sort_keys = False
+    app.json.compact = True
+
+def _dumps_body(obj):
+    """Serialize a response body compactly, preferring orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return app.json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def ojsonify(obj, status=200):
+    """Build a JSON response without going through flask.jsonify"""
+    return app.response_class(_dumps_body(obj), status=status, mimetype='application/json')
+
+# Telegram echoes the secret_token given to setWebhook in this header, which
+# lets junk requests be rejected before any parsing
+TELEGRAM_WEBHOOK_SECRET = get_webhook_secret()
+_SECRET = TELEGRAM_WEBHOOK_SECRET.encode('utf-8')
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+# Telegram updates are a few KB; anything much larger is not an update.
+# Werkzeug enforces the limit while reading, which also covers chunked bodies
+MAX_BODY = int(os.getenv('MAX_WEBHOOK_BODY', 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_BODY
+
+_WEBHOOK_PATHS = ('/webhook', '/webhook/')
+_SET_WEBHOOK_PATHS = ('/set_webhook', '/set_webhook/')
+_SECRET_HEADER_KEY = SECRET_HEADER.lower().encode('latin-1')
+
+class WebhookGuard:
+    """ASGI middleware applying the webhook secret and body-size checks
+
+    asgiref's WsgiToAsgi buffers the whole request body before Flask sees
+    it, so under uvicorn the checks in webhook() would only run after an
+    oversized or unauthenticated body had been read in full. This rejects
+    such requests from the headers, and stops reading at MAX_BODY, before
+    handing the request on.
+    
+    asgiref also runs every request on one shared thread, so /set_webhook,
+    which blocks on a Telegram round trip, gets a thread of its own rather
+    than holding up the webhook acks queued behind it.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] in _SET_WEBHOOK_PATHS:
+            async with ThreadSensitiveContext():
+                return await self.app(scope, receive, send)
+        
+        if (scope['type'] != 'http' or scope['method'] != 'POST'
+                or scope['path'] not in _WEBHOOK_PATHS):
+            return await self.app(scope, receive, send)
+        
+        headers = dict(scope['headers'])
+        if _SECRET and not hmac.compare_digest(headers.get(_SECRET_HEADER_KEY, b''), _SECRET):
+            return await self._reject(send, 401)
+        
+        content_length = headers.get(b'content-length')
+        if content_length is not None and (not content_length.isdigit()
+                                           or int(content_length) > MAX_BODY):
+            return await self._reject(send, 413 if content_length.isdigit() else 400)
+        
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] != 'http.request':
+                return  # Client went away
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY:
+                return await self._reject(send, 413)
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        
+        # Replay the body that was already read, then hand back the real channel.
+        # A chunked body now has a known length; Werkzeug reads nothing from a
+        # chunked request the server hasn't marked as terminated, so present
+        # it as a plain Content-Length request
+        body = b''.join(chunks)
+        if content_length is None:
+            headers = [(name, value) for name, value in scope['headers']
+                       if name != b'transfer-encoding']
+            headers.append((b'content-length', str(len(body)).encode()))
+            scope = dict(scope, headers=headers)
+        buffered = {'type': 'http.request', 'body': body, 'more_body': False}
+        
+        async def replay():
+            nonlocal buffered
+            if buffered is None:
+                return await receive()
+            message, buffered = buffered, None
+            return message
+        
+        await self.app(scope, replay, send)
+    
+    @staticmethod
+    async def _reject(send, status):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-length', b'0')]})
+        await send({'type': 'http.response.body', 'body': b''})
+
+# ASGI entry point for uvicorn (asgiref runs every request on one shared
+# thread; the handler only enqueues updates, so this stays cheap)
+asgi_app = WebhookGuard(WsgiToAsgi(app)) if ASGI_AVAILABLE else None
+
+# Shared keep-alive session for all outbound Telegram API calls
+_TG_SESSION = requests.Session()
+_TG_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504])
+))
+
+# Optional coalescing of outbound messages: replies to the same chat that are
+# produced within one flush interval are joined into a single sendMessage
+BATCH_ENABLED = os.getenv('BATCH_ENABLED', '0') == '1'
+BATCH_FLUSH_INTERVAL = float(os.getenv('BATCH_FLUSH_INTERVAL', 3))
+MAX_BUFFER_SIZE = int(os.getenv('MAX_BUFFER_SIZE', 3800))  # Telegram caps messages at 4096 chars
+
+class MessageBatcher:
+    """Buffer outgoing messages per chat and send them in batches"""
+    
+    def __init__(self, send, flush_interval=BATCH_FLUSH_INTERVAL, max_chars=MAX_BUFFER_SIZE):
+        self._send = send
+        self.flush_interval = flush_interval
+        self.max_chars = max_chars
+        # chat_id -> list of batches, each a list of texts within max_chars
+        self._buffers = {}
+        self._lock = threading.Lock()
+        # Only one flush at a time, so each chat's batches go out in order
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='message-batcher', daemon=True)
+        self._thread.start()
+    
+    def send_message(self, chat_id, text):
+        """Queue a message; drop-in replacement for MultiUserManager.send_message"""
+        with self._lock:
+            batches = self._buffers.setdefault(chat_id, [])
+            current = batches[-1] if batches else None
+            if current is None or sum(map(len, current)) + len(current) + len(text) > self.max_chars:
+                if current is not None:
+                    self._wake.set()  # A full batch is ready, don't wait for the timer
+                batches.append([text])
+            else:
+                current.append(text)
+        return True
+    
+    def flush(self):
+        """Send everything buffered so far"""
+        with self._flush_lock:
+            with self._lock:
+                buffers, self._buffers = self._buffers, {}
+            for chat_id, batches in buffers.items():
+                for batch in batches:
+                    self._send(chat_id, '\n'.join(batch))
+    
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing message batches: {e}")
+
 # Initialize bot handler
 if BOT_HANDLER_AVAILABLE:
     bot_handler = TelegramBotHandler()
+    bot_handler.user_manager.session = _TG_SESSION
+    if BATCH_ENABLED:
+        message_batcher = MessageBatcher(bot_handler.user_manager.send_message)
+        bot_handler.user_manager.send_message = message_batcher.send_message
+        atexit.register(message_batcher.flush)
 else:
     bot_handler = None
 
+# Updates are handled in the background so Telegram gets its 200 right away.
+# Updates for the same chat are processed one at a time, in arrival order,
+# and the number of pending updates is capped to bound memory use.
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', 16))
+MAX_PENDING_UPDATES = int(os.getenv('MAX_PENDING_UPDATES', 1000))
+
+_update_executor = ThreadPoolExecutor(max_workers=BOT_WORKERS, thread_name_prefix='update')
+_pending_updates = threading.BoundedSemaphore(MAX_PENDING_UPDATES)
+_chat_queues = {}
+_chat_queues_lock = threading.Lock()
+
+def _update_chat_id(update_data):
+    """Chat an update belongs to (None for updates without a message)"""
+    message = update_data.get('message') or {}
+    return (message.get('chat') or {}).get('id')
+
+def _is_update(update_data):
+    """Whether a parsed body has the shape of a Telegram update
+
+    Every update carries an update_id; when a message is present it and its
+    chat must be objects with an integer chat id, so the queueing code can
+    rely on them
+    """
+    if not isinstance(update_data, dict) or 'update_id' not in update_data:
+        return False
+    message = update_data.get('message')
+    if message is None:
+        return True
+    if not isinstance(message, dict):
+        return False
+    chat = message.get('chat')
+    if chat is None:
+        return True
+    return isinstance(chat, dict) and isinstance(chat.get('id'), (int, type(None)))
+
+def _drain_chat_queue(chat_id):
+    """Process queued updates for one chat until its queue is empty"""
+    try:
+        while True:
+            with _chat_queues_lock:
+                queue = _chat_queues[chat_id]
+                if not queue:
+                    return
+                update_data = queue.popleft()
+            try:
+                bot_handler.process_update(update_data)
+            except Exception as e:
+                _log_deduped(logging.ERROR, "Error processing update in background: %s", e)
+            finally:
+                _pending_updates.release()
+    except Exception as e:
+        _log_deduped(logging.ERROR, "Chat queue drain stopped unexpectedly: %s", e)
+    finally:
+        # However the loop ended, never leave the chat registered without a
+        # worker: later updates would be queued behind it and never run
+        with _chat_queues_lock:
+            if _chat_queues[chat_id]:
+                resubmit = True
+            else:
+                del _chat_queues[chat_id]
+                resubmit = False
+        if resubmit:
+            _update_executor.submit(_drain_chat_queue, chat_id)
+
+def enqueue_update(update_data):
+    """Queue an update for background processing; False if the queue is full"""
+    # Resolve the chat first so nothing can fail while a permit is held
+    chat_id = _update_chat_id(update_data)
+    if not _pending_updates.acquire(blocking=False):
+        return False
+    
+    with _chat_queues_lock:
+        queue = _chat_queues.get(chat_id)
+        if queue is not None:
+            # A worker is already draining this chat and will pick it up
+            queue.append(update_data)
+            return True
+        _chat_queues[chat_id] = deque([update_data])
+    
+    _update_executor.submit(_drain_chat_queue, chat_id)
+    return True
+
+# Health check body never changes, so serialize it once
+_HEALTH_BODY = _dumps_body({
+    'status': 'ok',
+    'message': 'German Daily Word Bot Webhook Server',
+    'bot_available': BOT_HANDLER_AVAILABLE
+})
+
 @app.route('/', methods=['GET'])
 def index():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'ok',
-        'message': 'German Daily Word Bot Webhook Server',
-        'bot_available': BOT_HANDLER_AVAILABLE
-    })
+    return Response(_HEALTH_BODY, status=200, mimetype='application/json')
 
-@app.route('/webhook', methods=['POST'])
+@app.route('/webhook', methods=['POST'], provide_automatic_options=False)
 def webhook():
-    """Webhook endpoint for Telegram updates"""
+    """Webhook endpoint for Telegram updates (responses carry no body;
+    failure details go to the log)"""
+    if _SECRET and not hmac.compare_digest(
+        request.headers.get(SECRET_HEADER, '').encode('utf-8'), _SECRET
+    ):
+        return b'', 401
+    
+    # Fast path for declared sizes; undeclared ones are capped while reading
+    if (request.content_length or 0) > MAX_BODY:
+        return b'', 413
+    
     try:
         if not bot_handler:
-            return jsonify({'error': 'Bot handler not available'}), 500
+            return b'', 500
         
-        # Get update data
-        update_data = request.get_json()
+        # Get update data; Telegram always sends UTF-8 JSON, so parse the raw
+        # body directly instead of going through request.get_json()
+        try:
+            raw = request.get_data(cache=False)
+        except RequestEntityTooLarge:
+            return b'', 413
+        if request.content_length is None and len(raw) >= MAX_BODY:
+            # Werkzeug stops reading an undeclared-length body at the limit
+            # instead of raising, so a body that fills it was cut short
+            return b'', 413
+        try:
+            update_data = loads_json(raw) if raw else None
+        except ValueError:
+            return b'', 400
         
-        if not update_data:
-            return jsonify({'error': 'No data received'}), 400
+        # Anything not shaped like an update (empty bodies, scanner junk) is
+        # rejected before it reaches the queue or the handler
+        if not _is_update(update_data):
+            return b'', 400
         
-        # Process the update
-        bot_handler.process_update(update_data)
+        # Hand the update off and acknowledge immediately; when the queue is
+        # full a 503 makes Telegram retry later
+        if not enqueue_update(update_data):
+            _log_deduped(logging.WARNING, "Update queue full, rejecting update")
+            return b'', 503
         
-        return jsonify({'status': 'ok'})
+        # Telegram only looks at the status code, so the ack has no body
+        return b'', 200
         
     except Exception as e:
-        logger.error(f"Webhook error: {e}")
-        return jsonify({'error': str(e)}), 500
+        _log_deduped(logging.ERROR, "Webhook error: %s", e)
+        return b'', 500
 
-@app.route('/set_webhook', methods=['POST'])
+@app.route('/set_webhook', methods=['POST'], provide_automatic_options=False)
 def set_webhook():
     """Set webhook URL for the bot"""
     try:
-        import requests
-        
-        bot_token = os.getenv('BOT_TOKEN')
         webhook_url = request.json.get('webhook_url')
         
-        if not bot_token or not webhook_url:
-            return jsonify({'error': 'Missing bot_token or webhook_url'}), 400
+        if not _SET_WEBHOOK_URL or not webhook_url:
+            return ojsonify({'error': 'Missing bot_token or webhook_url'}, 400)
         
         # Set webhook
-        api_url = f"https://api.telegram.org/bot{bot_token}/setWebhook"
-        data = {'url': webhook_url}
+        data = dict(_WEBHOOK_OPTIONS, **webhook_params(webhook_url))
         
-        response = requests.post(api_url, data=data)
+        response = _TG_SESSION.post(_SET_WEBHOOK_URL, data=data, timeout=(3.05, 10))
         
         if response.status_code == 200:
-            return jsonify({'status': 'Webhook set successfully'})
+            return ojsonify({'status': 'Webhook set successfully'})
         else:
-            return jsonify({'error': response.text}), 500
+            return ojsonify({'error': response.text}, 500)
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}, 500)
 
 if __name__ == '__main__':
     if not BOT_HANDLER_AVAILABLE:
@@ -102,9 +475,33 @@ if __name__ == '__main__':
     print("📡 Webhook endpoint: /webhook")
     print("🔧 Health check: /")
     
-    # Run Flask app
-    app.run(
-        host='0.0.0.0',
-        port=int(os.getenv('PORT', 5000)),
-        debug=False
-    )
+    port = int(os.getenv('PORT', 5000))
+    
+    if ASGI_AVAILABLE:
+        # Always a single process: each process has its own update pool and
+        # per-chat queues, so more than one would break per-chat ordering
+        # and let two processes write the same progress files at once.
+        # Some hosts set WEB_CONCURRENCY automatically, so it is not honoured
+        if int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+            logger.error("Ignoring WEB_CONCURRENCY=%s: the webhook server runs as a single process",
+                         os.getenv('WEB_CONCURRENCY'))
+        
+        # Serve this module's app object; an import string would load the
+        # module a second time with its own bot handler and update pool.
+        # workers is explicit since uvicorn falls back to WEB_CONCURRENCY
+        uvicorn.run(
+            asgi_app,
+            host='0.0.0.0',
+            port=port,
+            workers=1,
+            loop='auto',  # uvloop when installed
+            access_log=False
+        )
+    else:
+        # Run Flask app
+        app.run(
+            host='0.0.0.0',
+            port=port,
+            debug=False,
+            threaded=True
+        )